@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+# ----------------------------------------------------------------------------
+# Write a synthetic MekHQ campaign for benchmarking process_campaign.py
+# ----------------------------------------------------------------------------
+
+#This creates a directory laid out like a MekHQ install, with a campaign
+#file in campaigns/, a rank system file in data/universe/ranks.xml, and 
+#portraits in data/images/portraits/, so it can be used as mekhq_path.
+#Everything is random but seeded, so the same options always give the 
+#same campaign.
+
+import argparse
+import gzip
+import os
+import random
+import struct
+import zlib
+from xml.sax.saxutils import escape, quoteattr
+
+roles = ["MECHWARRIOR", "AEROSPACE_PILOT", "GROUND_VEHICLE_DRIVER",
+         "VEHICLE_GUNNER", "BATTLE_ARMOUR", "SOLDIER", "VESSEL_PILOT",
+         "VESSEL_CREW", "VESSEL_NAVIGATOR", "MECH_TECH", "AERO_TECH",
+         "DOCTOR", "ADMINISTRATOR_COMMAND", "ASTECH", "MEDIC"]
+
+skills = ["Gunnery/Mech", "Piloting/Mech", "Gunnery/Aerospace", 
+          "Piloting/Aerospace", "Piloting/Ground Vehicle", "Gunnery/Vehicle",
+          "Gunnery/Battlesuit", "Anti-Mech", "Small Arms", 
+          "Piloting/Spacecraft", "Tech/Vessel", "Hyperspace Navigation",
+          "Tech/Mech", "Tech/Aero", "Doctor", "Administration", "Astech",
+          "Medtech"]
+
+statuses = ["ACTIVE", "ACTIVE", "ACTIVE", "RETIRED", "KIA", "MIA"]
+
+rank_names = ["None", "Private", "Corporal", "Sergeant", "Lieutenant", 
+              "Captain", "Major", "Colonel", "General"]
+
+words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", 
+         "adipiscing", "elit", "sed", "do", "eiusmod", "tempor"]
+
+#default sizes of each part of the campaign
+defaults = {
+    'personnel': 500,
+    'units': 150,
+    'crew': 3,
+    'kills': 2000,
+    'missions': 10,
+    'scenarios': 5,
+    'force_depth': 3,
+    'force_fanout': 3,
+    'portraits': 100,
+    'entity_size': 20000
+}
+
+def text(rng, n):
+    return ' '.join(rng.choice(words) for i in range(n))
+
+def write_ranks(file_path):
+    f = open(file_path, 'w')
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n<rankSystems>\n')
+    for code in ['SSLDF', 'SLDF', 'AFFS']:
+        f.write('<rankSystem>\n<code>' + code + '</code>\n')
+        for level in range(31):
+            name = rank_names[level % len(rank_names)] if level % 3 == 0 else '-'
+            names = [name, '--MW', name, name + ' (Naval)', '--MW', name + ' (Tech)']
+            f.write('<rank><rankNames>' + ','.join(names) + '</rankNames></rank>\n')
+        f.write('</rankSystem>\n')
+    f.write('</rankSystems>\n')
+    f.close()
+
+#write force elements recursively, handing out unit ids to the leaf forces
+def write_forces(f, rng, depth, options, unit_ids, counter):
+    counter[0] += 1
+    force_id = counter[0]
+    f.write('<force id="' + str(force_id) + '">\n<name>' + 
+            escape(rng.choice(words).title() + ' ' + str(force_id)) + '</name>\n')
+    f.write('<desc>' + escape(text(rng, 30)) + '</desc>\n')
+    if(depth == options['force_depth'] or options['force_fanout'] == 0):
+        if(len(unit_ids) > 0):
+            f.write('<units>\n')
+            for unit_id in unit_ids:
+                f.write('<unit id="' + unit_id + '"/>\n')
+            f.write('</units>\n')
+    else:
+        f.write('<subforces>\n')
+        fanout = options['force_fanout']
+        for i in range(fanout):
+            write_forces(f, rng, depth + 1, options, unit_ids[i::fanout], counter)
+        f.write('</subforces>\n')
+    f.write('</force>\n')
+
+#a 1x1 GIF, used for default.gif
+blank_gif = (b'GIF89a\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00!\xf9\x04'
+             b'\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;')
+
+#write a PNG of width by height pixels made of randomly colored horizontal 
+#bands, so that portraits are real images that can be resized
+def write_portrait(file_path, rng, width=300, height=400):
+    rows = []
+    for y in range(height):
+        if(y % 8 == 0):
+            color = bytes(rng.randrange(256) for i in range(3))
+        rows.append(b'\x00' + color * width)
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data + 
+                struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    with open(file_path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(b''.join(rows))))
+        f.write(chunk(b'IEND', b''))
+
+#write a synthetic campaign to campaigns/<name> in mekhq_dir, creating 
+#the rank and portrait files it needs. Returns the path to the campaign file
+def generate_campaign(mekhq_dir, options=None, name='synthetic.cpnx.gz', seed=1):
+    options = dict(defaults, **(options or {}))
+    rng = random.Random(seed)
+    for directory in ['campaigns', 'data/universe', 'data/images/portraits/Synthetic']:
+        os.makedirs(os.path.join(mekhq_dir, directory), exist_ok=True)
+    write_ranks(os.path.join(mekhq_dir, 'data/universe/ranks.xml'))
+    portrait_dir = os.path.join(mekhq_dir, 'data/images/portraits/')
+    with open(portrait_dir + 'default.gif', 'wb') as f:
+        f.write(blank_gif)
+    for i in range(options['portraits']):
+        write_portrait(portrait_dir + 'Synthetic/' + str(i) + '.png', rng)
+
+    person_ids = ['person-' + str(i) for i in range(options['personnel'])]
+    unit_ids = ['unit-' + str(i) for i in range(options['units'])]
+    campaign_path = os.path.join(mekhq_dir, 'campaigns', name)
+    if(name.endswith('gz')):
+        f = gzip.open(campaign_path, 'wt', encoding='utf-8', compresslevel=1)
+    else:
+        f = open(campaign_path, 'w', encoding='utf-8')
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n<campaign version="0.49.19">\n')
+    f.write('<info>\n<name>Synthetic</name>\n<calendar>3072-06-01</calendar>\n')
+    f.write('<rankSystem>\n<system>SLDF</system>\n</rankSystem>\n</info>\n')
+
+    f.write('<skillTypes>\n')
+    for skill in skills:
+        f.write('<skillType>\n<name>' + skill + '</name>\n<target>7</target>\n')
+        f.write('<countUp>' + ('true' if skill == 'Anti-Mech' else 'false') + '</countUp>\n')
+        f.write('<greenLvl>1</greenLvl>\n<regLvl>3</regLvl>\n<vetLvl>4</vetLvl>\n<eliteLvl>5</eliteLvl>\n')
+        f.write('</skillType>\n')
+    f.write('</skillTypes>\n')
+
+    f.write('<personnel>\n')
+    for i, person_id in enumerate(person_ids):
+        status = rng.choice(statuses)
+        f.write('<person>\n<id>' + person_id + '</id>\n')
+        f.write('<primaryRole>' + rng.choice(roles) + '</primaryRole>\n')
+        f.write('<givenName>' + rng.choice(words).title() + '</givenName>\n')
+        f.write('<surname>' + rng.choice(words).title() + str(i) + '</surname>\n')
+        if(rng.random() < 0.2):
+            f.write('<callsign>' + rng.choice(words).title() + '</callsign>\n')
+        f.write('<status>' + status + '</status>\n')
+        f.write('<birthday>30' + str(rng.randint(20, 50)) + '-0' + str(rng.randint(1, 9)) + '-1' + str(rng.randint(0, 9)) + '</birthday>\n')
+        if(status == 'KIA'):
+            f.write('<deathday>3071-05-05</deathday>\n')
+        f.write('<rank>' + str(rng.randint(0, 30)) + '</rank>\n')
+        if(options['portraits'] > 0 and rng.random() < 0.8):
+            f.write('<portrait>\n<category>Synthetic/</category>\n<filename>' + 
+                    str(rng.randrange(options['portraits'])) + '.png</filename>\n</portrait>\n')
+        f.write('<biography>' + escape(escape('<p>' + text(rng, 200) + '</p>')) + '</biography>\n')
+        for skill in rng.sample(skills, 6):
+            f.write('<skill>\n<type>' + skill + '</type>\n<level>' + str(rng.randint(0, 7)) + 
+                    '</level>\n<bonus>' + str(rng.randint(0, 1)) + '</bonus>\n</skill>\n')
+        f.write('</person>\n')
+    f.write('</personnel>\n')
+
+    f.write('<missions>\n')
+    scenario_id = 0
+    for mission_id in range(options['missions']):
+        f.write('<mission id="' + str(mission_id) + '" type="AtBContract">\n')
+        f.write('<name>Mission ' + str(mission_id) + ' ' + rng.choice(words).title() + '</name>\n')
+        f.write('<type>Garrison Duty</type>\n<desc>' + escape(text(rng, 100)) + '</desc>\n')
+        f.write('<startDate>3070-01-01</startDate>\n<endDate>3070-06-01</endDate>\n')
+        f.write('<employer>Federated Suns</employer>\n<systemId>New Avalon</systemId>\n')
+        f.write('<status>' + rng.choice(['ACTIVE', 'SUCCESS', 'FAILED']) + '</status>\n')
+        f.write('<scenarios>\n')
+        for i in range(options['scenarios']):
+            f.write('<scenario id="' + str(scenario_id) + '">\n<name>Scenario ' + str(i) + '</name>\n')
+            f.write('<desc>' + escape(text(rng, 50)) + '</desc>\n<report>' + escape(text(rng, 300)) + '</report>\n')
+            f.write('<date>3070-02-0' + str(1 + i % 9) + '</date>\n<status>VICTORY</status>\n</scenario>\n')
+            scenario_id += 1
+        f.write('</scenarios>\n</mission>\n')
+    f.write('</missions>\n')
+
+    f.write('<forces>\n')
+    write_forces(f, rng, 0, options, unit_ids, [0])
+    f.write('</forces>\n')
+
+    f.write('<units>\n')
+    crew_slots = ['driverId', 'gunnerId', 'vesselCrewId']
+    blob = escape(text(rng, options['entity_size'] // 6))
+    for i, unit_id in enumerate(unit_ids):
+        f.write('<unit id="' + unit_id + '" type="Mek">\n')
+        for slot in range(options['crew']):
+            person_id = person_ids[(i * options['crew'] + slot) % len(person_ids)]
+            f.write('<' + crew_slots[min(slot, 2)] + '>' + person_id + '</' + crew_slots[min(slot, 2)] + '>\n')
+        f.write('<entity chassis=' + quoteattr(rng.choice(words).title()) + ' model="X-' + str(i) + '" type="Mech">\n')
+        f.write('<armor>' + blob + '</armor>\n</entity>\n</unit>\n')
+    f.write('</units>\n')
+
+    f.write('<kills>\n')
+    for i in range(options['kills']):
+        f.write('<kill>\n<pilotId>' + rng.choice(person_ids) + '</pilotId>\n')
+        f.write('<killed>Enemy ' + str(i) + '</killed>\n<killer>' + rng.choice(words).title() + '</killer>\n')
+        f.write('<date>3070-02-01</date>\n')
+        if(options['missions'] > 0 and options['scenarios'] > 0):
+            f.write('<missionId>' + str(rng.randrange(options['missions'])) + '</missionId>\n')
+            f.write('<scenarioId>' + str(rng.randrange(scenario_id)) + '</scenarioId>\n')
+        f.write('</kill>\n')
+    f.write('</kills>\n')
+    f.write('</campaign>\n')
+    f.close()
+    return campaign_path
+
+#command line options for each size in defaults
+def add_size_arguments(parser):
+    parser.add_argument('--personnel', type=int, default=defaults['personnel'])
+    parser.add_argument('--units', type=int, default=defaults['units'])
+    parser.add_argument('--crew', type=int, default=defaults['crew'],
+                        help='crew slots filled on each unit')
+    parser.add_argument('--kills', type=int, default=defaults['kills'])
+    parser.add_argument('--missions', type=int, default=defaults['missions'])
+    parser.add_argument('--scenarios', type=int, default=defaults['scenarios'],
+                        help='scenarios per mission')
+    parser.add_argument('--force-depth', type=int, default=defaults['force_depth'])
+    parser.add_argument('--force-fanout', type=int, default=defaults['force_fanout'])
+    parser.add_argument('--portraits', type=int, default=defaults['portraits'],
+                        help='number of distinct portrait files')
+    parser.add_argument('--entity-size', type=int, default=defaults['entity_size'],
+                        help='approximate bytes of entity data per unit')
+
+def get_size_options(args):
+    return {key: getattr(args, key) for key in defaults}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic MekHQ campaign.')
+    parser.add_argument('mekhq_dir', help='directory to write the fake MekHQ install to')
+    parser.add_argument('--name', default='synthetic.cpnx.gz', 
+                        help='campaign file name, ending in .cpnx or .cpnx.gz')
+    parser.add_argument('--seed', type=int, default=1)
+    add_size_arguments(parser)
+    args = parser.parse_args()
+    print(generate_campaign(args.mekhq_dir, get_size_options(args), args.name, args.seed))
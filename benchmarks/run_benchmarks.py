@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+# ----------------------------------------------------------------------------
+# Time each stage of process_campaign.py against synthetic campaigns
+# ----------------------------------------------------------------------------
+
+#For each scale, a synthetic campaign is generated with every size option
+#(except the force tree shape and crew per unit) multiplied by the scale, 
+#and then exported into an empty site directory. Each stage is timed over 
+#several runs, keeping the fastest, and then run once more under 
+#tracemalloc to find its peak memory. Results can be saved as JSON and 
+#compared against an earlier run to catch regressions.
+#
+#Example:
+#   ./benchmarks/run_benchmarks.py --scales 1,2,4 --output before.json
+#   ./benchmarks/run_benchmarks.py --scales 1,2,4 --compare before.json
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(bench_dir)
+sys.path.insert(0, repo_dir)
+
+import process_campaign
+from generate_campaign import generate_campaign, add_size_arguments, get_size_options
+
+#sizes that stay the same at every scale
+fixed_sizes = ['crew', 'force_depth', 'force_fanout', 'entity_size']
+
+#directories the export writes into
+site_dirs = ['campaign/_forces', 'campaign/_missions', 'campaign/_personnel',
+             'campaign/_scenarios', 'assets/images/portraits', '_data']
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], 
+                                       cwd=repo_dir, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def make_site(work_dir):
+    site = tempfile.mkdtemp(dir=work_dir)
+    for directory in site_dirs:
+        os.makedirs(os.path.join(site, directory))
+    return site
+
+#run every export stage once in site, returning the seconds taken by each
+#stage and, if tracing memory, the peak traced memory in each stage
+def run_export(campaign_path, site, workers, trace_memory):
+    old_dir = os.getcwd()
+    os.chdir(site)
+    results = {}
+    export = process_campaign.start_export(campaign_path, workers)
+    try:
+        for stage_name, stage in process_campaign.export_stages:
+            if(trace_memory):
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            stage(export)
+            results[stage_name] = {'seconds': time.perf_counter() - start}
+            if(trace_memory):
+                results[stage_name]['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        export.writer.finish()
+    finally:
+        export.pool.shutdown()
+        os.chdir(old_dir)
+    return results
+
+def benchmark_scale(work_dir, sizes, scale, args):
+    options = {key: (value if key in fixed_sizes else value * scale) 
+               for key, value in sizes.items()}
+    mekhq_dir = os.path.join(work_dir, 'mekhq-' + str(scale))
+    name = 'synthetic.cpnx.gz' if args.gzip else 'synthetic.cpnx'
+    campaign_path = generate_campaign(mekhq_dir, options, name)
+    process_campaign.mekhq_path = mekhq_dir + '/'
+    process_campaign.user_data_path = os.path.join(work_dir, 'no-user-data') + '/'
+    stages = {}
+    site = make_site(work_dir)
+    for repeat in range(args.repeat):
+        if(not args.warm):
+            shutil.rmtree(site)
+            site = make_site(work_dir)
+        for stage_name, result in run_export(campaign_path, site, args.workers, False).items():
+            best = stages.setdefault(stage_name, result)
+            best['seconds'] = min(best['seconds'], result['seconds'])
+    if(not args.no_memory):
+        if(not args.warm):
+            shutil.rmtree(site)
+            site = make_site(work_dir)
+        tracemalloc.start()
+        for stage_name, result in run_export(campaign_path, site, args.workers, True).items():
+            stages[stage_name]['peak_mb'] = result['peak_mb']
+        tracemalloc.stop()
+    return {
+        'scale': scale,
+        'sizes': options,
+        'file_mb': os.path.getsize(campaign_path) / 2**20,
+        'stages': stages,
+        'total_seconds': sum(stage['seconds'] for stage in stages.values())
+    }
+
+def print_results(results, baseline=None, tolerance=0.2):
+    stage_names = [stage_name for stage_name, stage in process_campaign.export_stages]
+    print('%-18s' % 'stage' + ''.join('%14s' % ('x' + str(result['scale'])) for result in results))
+    for stage_name in stage_names + ['total']:
+        row = '%-18s' % stage_name
+        for result in results:
+            if(stage_name == 'total'):
+                seconds = result['total_seconds']
+            else:
+                seconds = result['stages'][stage_name]['seconds']
+            cell = '%.3fs' % seconds
+            old = baseline.get(result['scale']) if baseline else None
+            if(old is not None):
+                if(stage_name == 'total'):
+                    old_seconds = old['total_seconds']
+                else:
+                    old_seconds = old['stages'].get(stage_name, {}).get('seconds')
+                if(old_seconds):
+                    ratio = seconds / old_seconds
+                    cell = cell + ('!' if ratio > 1 + tolerance else ' ') + '%.2f' % ratio
+            row = row + '%14s' % cell
+        print(row)
+    if('peak_mb' in results[0]['stages'][stage_names[0]]):
+        print('\npeak traced memory (MB)')
+        for stage_name in stage_names:
+            print('%-18s' % stage_name + ''.join('%14.1f' % result['stages'][stage_name]['peak_mb'] 
+                                                 for result in results))
+    print('\n%-18s' % 'campaign file (MB)' + ''.join('%14.1f' % result['file_mb'] for result in results))
+    if(baseline):
+        print('\nratios are against the baseline run, ! marks a slowdown of more than ' + 
+              str(int(tolerance * 100)) + '%')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark process_campaign.py on synthetic campaigns.')
+    parser.add_argument('--scales', default='1,2,4', 
+                        help='comma separated multipliers for the campaign size')
+    parser.add_argument('--repeat', type=int, default=3, 
+                        help='timed runs per scale, the fastest is kept')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='render worker processes, 1 renders in the main process')
+    parser.add_argument('--warm', action='store_true',
+                        help='re-export into the same site and caches instead of an empty one')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--plain', dest='gzip', action='store_false', 
+                        help='write uncompressed .cpnx campaigns')
+    parser.add_argument('--output', help='save results to this JSON file')
+    parser.add_argument('--compare', help='compare against results saved with --output')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='slowdown ratio above 1 that is flagged when comparing')
+    parser.add_argument('--keep', help='generate campaigns and sites here and keep them')
+    add_size_arguments(parser)
+    args = parser.parse_args()
+
+    sizes = get_size_options(args)
+    scales = [int(scale) for scale in args.scales.split(',')]
+    work_dir = args.keep or tempfile.mkdtemp(prefix='mekhq-bench-')
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    try:
+        for scale in scales:
+            results.append(benchmark_scale(work_dir, sizes, scale, args))
+    finally:
+        if(args.keep is None):
+            shutil.rmtree(work_dir)
+
+    baseline = None
+    if(args.compare):
+        with open(args.compare) as f:
+            baseline = {result['scale']: result for result in json.load(f)['results']}
+    print_results(results, baseline, args.tolerance)
+
+    if(args.output):
+        with open(args.output, 'w') as f:
+            json.dump({
+                'commit': get_commit(),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'options': vars(args),
+                'results': results
+            }, f, indent=1)
+
+if __name__ == '__main__':
+    main()
@@ -84,9 +84,28 @@ personnel_status_dict = {
     "MIA": "Missing in Action"
 }
 
+#personnel statuses counted as casualties in _data/force_stats.json
+casualty_statuses = ["Killed in Action","Missing in Action"]
+
 #skill level names
 skill_level_names = ["Ultra-Green","Green","Regular","Veteran","Elite"]
 
+#write a tally of kills by person, mission, and scenario to _data/kills.yml
+#so that it can be used in templates
+write_kill_data = False
+
+#number of people on each page of the rosters shown on the pages in the 
+#personnel-roles directory. Larger rosters are split across several pages
+roster_page_size = 100
+
+#widths in pixels of the smaller copies of each portrait, twice the size they
+#are shown at so they stay sharp. Each is made in the portrait's own format 
+#and as WebP, and needs Pillow
+portrait_variants = {
+    "small": 150,
+    "medium": 400
+}
+
 #beginning of portait paths, only change if default image changes
 portrait_paths = {
     "default.gif": "default.gif"
@@ -96,6 +115,48 @@ portrait_paths = {
 skill_dict = {
 }
 
+#compiled rank table, see load_rank_table
+rank_table = {
+}
+
+#compiled rank tables that have already been loaded, keyed by the absolute
+#path of their ranks file. Used to share rank tables in batch mode
+shared_rank_tables = {
+}
+
+#directory for caches kept between runs. Jekyll ignores directories that
+#start with a dot, so this will not end up on the website
+cache_path = '.mekhq-cache/'
+
+#stream the campaign file record by record rather than loading the whole
+#thing into memory. Large campaigns can have saves of hundreds of MB, most of
+#which is unit data we never read. Set to False to use a full parse instead.
+stream_campaign = True
+
+#number of worker processes used to render pages. None uses one per CPU and
+#1 renders everything in this process. Small campaigns are always rendered in
+#this process since starting the workers would take longer than the work
+render_workers = None
+parallel_render_threshold = 200
+parallel_encode_threshold = 8
+
+#the top-level sections of the campaign file that we actually use
+campaign_sections = ['info', 'skillTypes', 'personnel', 'missions', 'forces',
+                     'units', 'kills']
+
+#the parts of the website an export can be limited to (see --only), with the
+#campaign file sections each needs and the directories each writes to. data
+#covers the whole campaign, so it is only exported when everything else is
+export_sections = {
+    'forces': (['info', 'forces'], ['campaign/_forces']),
+    'personnel': (['info', 'skillTypes', 'personnel', 'forces', 'units', 'kills'], 
+                  ['campaign/_personnel']),
+    'missions': (['info', 'missions'], ['campaign/_missions', 'campaign/_scenarios']),
+    'portraits': (['info', 'personnel'], 
+                  ['assets/images/portraits', 'assets/images/portraits/variants']),
+    'data': (campaign_sections, ['personnel-roles/pages'])
+}
+
 # ----------------------------------------------------------------------------
 # imports
 # ----------------------------------------------------------------------------
@@ -103,12 +164,26 @@ skill_dict = {
 import xml.etree.ElementTree as ET
 import re
 import datetime
-from dateutil import relativedelta
 from html import unescape
 import os
+import sys
 import glob
-from shutil import copyfile
+import shutil
+import io
 import gzip
+import json
+import pickle
+import sqlite3
+import threading
+import time
+import hashlib
+import argparse
+import tracemalloc
+import cProfile
+import traceback
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 
 
 # ----------------------------------------------------------------------------
@@ -141,10 +216,80 @@ def get_xml_text(ele):
 def get_xml_date(ele):
     if(ele is not None and ele.text is not None):
         date  = ele.text.split(" ")[0]
-        return datetime.datetime.strptime(date, '%Y-%m-%d')
+        try:
+            #much quicker than strptime for the usual yyyy-mm-dd
+            return datetime.datetime.fromisoformat(date)
+        except ValueError:
+            return datetime.datetime.strptime(date, '%Y-%m-%d')
     else:
         return None
 
+#take an xml element with a whole number in it and convert to int, or 0 if
+#the element is missing or empty
+def get_xml_int(ele):
+    text = get_xml_text(ele)
+    if(text == ''):
+        return 0
+    return int(text)
+
+#take an xml element with true or false in it and convert to bool
+def get_xml_bool(ele):
+    return get_xml_text(ele) == 'true'
+
+#take an xml element as it is, for fields of a RecordReader that are 
+#read further by the caller
+def get_xml_element(ele):
+    return ele
+
+#custom class for reading the fields of a record, given as a list of (tag, 
+#convert), in one pass over the children of an element. As with find, the 
+#first child with a tag wins; fields whose tags are in a list collect them all
+class RecordReader:
+    def __init__(self, fields, lists=()):
+        self.slots = {}
+        self.defaults = []
+        self.list_slots = []
+        self.copy_slots = []
+        for index, (tags, convert) in enumerate(fields):
+            if(not isinstance(tags, tuple)):
+                tags = (tags,)
+            many = any(tag in lists for tag in tags)
+            default = [] if many else convert(None)
+            self.defaults.append(default)
+            if(isinstance(default, (list, dict, set))):
+                #every record needs its own copy of a default that can be 
+                #changed
+                self.copy_slots.append(index)
+            if(many):
+                self.list_slots.append(index)
+            elif(convert is get_xml_text):
+                #most fields are plain text, so take those straight from 
+                #the element rather than calling get_xml_text for them
+                convert = None
+            for tag in tags:
+                self.slots[tag] = (index, convert, many)
+
+    def read(self, ele):
+        values = self.defaults[:]
+        for index in self.copy_slots:
+            values[index] = values[index].copy()
+        slots = self.slots
+        #go through the children backwards so that the first child with a 
+        #tag is the one that ends up in its field
+        for child in reversed(ele):
+            slot = slots.get(child.tag)
+            if(slot is not None):
+                index, convert, many = slot
+                if(convert is None):
+                    values[index] = child.text or ''
+                elif(many):
+                    values[index].append(convert(child))
+                else:
+                    values[index] = convert(child)
+        for index in self.list_slots:
+            values[index].reverse()
+        return values
+
 #read portrait pathway. Need to check for special cases
 def get_portrait_path(ele):
     path = get_xml_text(ele)
@@ -165,60 +310,614 @@ def replace_portrait_name(portrait_file, slug):
     suffix = portrait_file.split('.')[1]
     return slug + '.' + suffix
 
+#image formats we can keep when making smaller copies of portraits. Anything
+#else is made into a PNG
+portrait_formats = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG', '.gif': 'GIF'}
+
+#get the file names of the smaller copies of a portrait, as a dictionary with 
+#an entry for each of portrait_variants in the portrait's format and another
+#with -webp on the end for the WebP version
+def get_portrait_variants(portrait_file):
+    stem, suffix = os.path.splitext(portrait_file)
+    if(suffix.lower() not in portrait_formats):
+        suffix = '.png'
+    variants = {}
+    for variant in portrait_variants:
+        variants[variant] = stem + '-' + variant + suffix
+        variants[variant + '-webp'] = stem + '-' + variant + '.webp'
+    return variants
+
 #they switched over from int to enum for status
-#so need to consider both ways
+#so need to consider both ways. Unknown statuses are returned as they are
 def get_person_status(status):
     if(status.isdigit()):
-        return personnel_status_names[int(status)]
+        if(int(status) < len(personnel_status_names)):
+            return personnel_status_names[int(status)]
+        return status
     else:
-        return personnel_status_dict[status]
+        return personnel_status_dict.get(status, status)
     
 def get_person_role(role):
     return roles_dict[role]
 
-#loop through kills and count ones belonging to this uuid
-def count_kills(uuid, kills):
-  nkills = 0
-  for kill in kills.findall('kill'):
-    kill_id = kill.find('pilotId')
-    if(kill_id is not None and kill_id.text is not None):
-      if(uuid == kill_id.text):
-       nkills = nkills + 1
-  return nkills
-
-# get the name of the unit assigned to person uuid
-def get_unit_name(uuid, units):
-    for unit in units.findall('unit'):
-        if(unit.attrib['id'] == uuid):
-            entity = unit.find('entity')
-            if(entity is None):
-                return ''
-            else:
-                return entity.attrib['chassis'] + ' ' + entity.attrib['model']
-    return None
-  
-#loop through units and find the one assigned to a person by uuid
-def find_unit(uuid, units):
-    for unit in units.findall('unit'):
-        for current_id in unit.findall('driverId'):
-            if(current_id is not None and current_id.text is not None and current_id.text == uuid):
-                return unit.attrib['id']
-        for current_id in unit.findall('pilotId'):
-            if(current_id is not None and current_id.text is not None and current_id.text == uuid):
-                return unit.attrib['id']
-        for current_id in unit.findall('gunnerId'):
-            if(current_id is not None and current_id.text is not None and current_id.text == uuid):
-                return unit.attrib['id']
-        for current_id in unit.findall('vesselCrewId'):
-            if(current_id is not None and current_id.text is not None and current_id.text == uuid):
-                return unit.attrib['id']
+#get the rank system of a person, or default if they use the campaign's
+def get_person_rank_system(person, default):
+    if(person.rank_system == '' or person.rank_system == '-1'):
+        return default
+    return person.rank_system
+
+#read an id from a kill record, treating missing or negative values as unknown
+def get_kill_id(ele):
+    kill_id = get_xml_text(ele)
+    if(kill_id == '' or kill_id.startswith('-')):
+        return None
+    return kill_id
+
+#custom class for a tally of kills by pilot uuid, along with a breakdown
+#of each pilot's kills by mission and scenario id when the kill records
+#carry them
+class KillTally:
+    def __init__(self):
+        self.totals = {}
+        self.missions = {}
+        self.scenarios = {}
+
+    def add(self, uuid, mission_id, scenario_id):
+        self.totals[uuid] = self.totals.get(uuid, 0) + 1
+        if(mission_id is not None):
+            by_mission = self.missions.setdefault(uuid, {})
+            by_mission[mission_id] = by_mission.get(mission_id, 0) + 1
+        if(scenario_id is not None):
+            by_scenario = self.scenarios.setdefault(uuid, {})
+            by_scenario[scenario_id] = by_scenario.get(scenario_id, 0) + 1
+
+    def count(self, uuid):
+        return self.totals.get(uuid, 0)
+
+kill_reader = RecordReader([('pilotId', get_xml_text), ('missionId', get_kill_id),
+                            ('scenarioId', get_kill_id)])
+
+#loop through kills once and tally them up by pilot. kills is a list of 
+#(pilot uuid, mission id, scenario id) as read by kill_reader
+def tally_kills(kills):
+    tally = KillTally()
+    for uuid, mission_id, scenario_id in kills:
+        if(uuid != ''):
+            tally.add(uuid, mission_id, scenario_id)
+    return tally
+
+#write out the kill tally for the given people to a yaml data file. people
+#is a dictionary of uuid to slug and mission and scenario ids are swapped out
+#for their slugs (using a list of Mission) where we know them
+def write_kill_data_file(writer, file_path, tally, people, missions):
+    mission_slugs = {}
+    scenario_slugs = {}
+    for mission in missions:
+        mission_slugs[mission.mission_id] = urlify(mission.name)
+        for scenario in mission.scenarios:
+            if(scenario.scenario_id is not None):
+                scenario_slugs[scenario.scenario_id] = urlify(mission.name + ' ' + scenario.name)
+    f = writer.open(file_path)
+    for uuid, slug in people.items():
+        if(tally.count(uuid) == 0):
+            continue
+        f.write(slug + ':\n')
+        f.write('  total: ' + str(tally.count(uuid)) + '\n')
+        for label, counts, slugs in [('missions', tally.missions, mission_slugs), 
+                                     ('scenarios', tally.scenarios, scenario_slugs)]:
+            if(uuid in counts):
+                f.write('  ' + label + ':\n')
+                for kill_id, count in counts[uuid].items():
+                    f.write('    ' + slugs.get(kill_id, kill_id) + ': ' + str(count) + '\n')
+    f.close()
+
+#crew slots on a unit that can hold a person
+crew_tags = ['driverId', 'pilotId', 'gunnerId', 'vesselCrewId']
+
+#build lookups for a dictionary of unit id to Unit in a single pass. Returns
+#a dictionary of person uuid to the id of the unit they crew, and a 
+#dictionary of unit id to the name of the unit ('' if the unit has no entity)
+def index_units(units):
+    crew_units = {}
+    unit_names = {}
+    for unit_id, unit in units.items():
+        unit_names[unit_id] = unit.name
+        for uuid in unit.crew:
+            #if someone is listed on more than one unit, the first wins
+            crew_units.setdefault(uuid, unit_id)
+    return crew_units, unit_names
+
+#custom class for writing out generated files. Only files whose content 
+#changed are written, to a staging directory that finish moves into place at
+#once, so jekyll never sees a half-written site
+class SiteWriter:
+    def __init__(self, directories, known=None):
+        self.directories = directories
+        self.known = known
+        self.wanted = set()
+        self.counts = {}
+        self.staged = {}
+        self.digests = {}
+        self.lock = threading.Lock()
+        self.staging_path = cache_path + 'staging/'
+        #clear out anything left behind by an export that failed
+        shutil.rmtree(self.staging_path, ignore_errors=True)
+
+    #open a generated file for writing. Nothing is written to disk until
+    #the returned file is closed
+    def open(self, file_path):
+        return GeneratedFile(self, file_path)
+
+    #stage content (either str or bytes) to be written to file_path if it 
+    #has changed
+    def write(self, file_path, content):
+        if(isinstance(content, str)):
+            content = content.encode('utf-8')
+        file_path = os.path.normpath(file_path)
+        with self.lock:
+            self.wanted.add(file_path)
+        if(self.known is not None and file_path in self.known):
+            digest = hashlib.sha1(content).digest()
+            outcome = 'unchanged' if self.known[file_path] == digest else 'changed'
+        else:
+            try:
+                with open(file_path, 'rb') as f:
+                    same = f.read() == content
+                outcome = 'unchanged' if same else 'changed'
+            except FileNotFoundError:
+                outcome = 'added'
+        if(outcome != 'unchanged'):
+            staged_file = os.path.join(self.staging_path, file_path)
+            os.makedirs(os.path.dirname(staged_file), exist_ok=True)
+            with open(staged_file, 'wb') as f:
+                f.write(content)
+            with self.lock:
+                self.staged[file_path] = staged_file
+        if(self.known is not None):
+            with self.lock:
+                self.digests[file_path] = hashlib.sha1(content).digest()
+        self.count(file_path, outcome)
+
+    #mark file_path as generated without touching it
+    def keep(self, file_path):
+        file_path = os.path.normpath(file_path)
+        with self.lock:
+            self.wanted.add(file_path)
+        self.count(file_path, 'unchanged')
+
+    def count(self, file_path, outcome):
+        directory = os.path.dirname(file_path)
+        with self.lock:
+            if(directory not in self.counts):
+                self.counts[directory] = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+            self.counts[directory][outcome] += 1
+
+    def finish(self):
+        #os.replace is atomic, so each file is either the old version or the
+        #new one, never half written
+        for file_path, staged_file in self.staged.items():
+            os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+            os.replace(staged_file, file_path)
+        self.staged.clear()
+        shutil.rmtree(self.staging_path, ignore_errors=True)
+        if(self.known is not None):
+            self.known.update(self.digests)
+        for directory in self.directories:
+            for file_path in glob.glob(os.path.join(directory, '*')):
+                file_path = os.path.normpath(file_path)
+                if(file_path not in self.wanted and os.path.isfile(file_path)):
+                    os.remove(file_path)
+                    self.count(file_path, 'removed')
+                    if(self.known is not None):
+                        self.known.pop(file_path, None)
+        lines = []
+        for directory in sorted(self.counts):
+            counts = self.counts[directory]
+            lines.append(directory + ': ' + ', '.join(str(counts[outcome]) + ' ' + outcome 
+                                                      for outcome in counts))
+        return '\n'.join(lines)
+
+#an in-memory file that hands its contents to a SiteWriter when closed
+class GeneratedFile(io.StringIO):
+    def __init__(self, writer, file_path):
+        super().__init__()
+        self.writer = writer
+        self.file_path = file_path
+
+    def close(self):
+        if(not self.closed):
+            self.writer.write(self.file_path, self.getvalue())
+        super().close()
+
+#find the source file for a portrait, looking first in the MekHQ directory and
+#then in the user data directory. Returns the path and its os.stat result, or
+#None if the portrait cannot be found
+def find_portrait_source(portrait_path):
+    for source_path in [mekhq_path, user_data_path]:
+        source_file = source_path + 'data/images/portraits/' + portrait_path
+        try:
+            return source_file, os.stat(source_file)
+        except OSError:
+            pass
     return None
 
-#loop through all the forces identified in element list and output them to
-#markdown files. At the end it calls itself to iteratively process the tree
-def process_forces(forces_ele, parent_name, parent_slug):
-    for force in forces_ele.findall('force'):
-        short_force_name = force.find('name').text
+#read the manifest of portraits written by the last run of sync_portraits
+def read_portrait_manifest():
+    try:
+        with open(cache_path + 'portraits.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+#get the smaller copies of each portrait that the last run of sync_portraits 
+#made, as a dictionary of portrait name to get_portrait_variants. Used when
+#portraits are not being exported
+def read_portrait_variants():
+    return {portrait_name: get_portrait_variants(portrait_name) 
+            for portrait_name, entry in read_portrait_manifest().items() 
+            if 'variants' in entry}
+
+#copy portraits into the portrait directory through writer, skipping sources
+#unchanged since the manifest of the last run, and make their smaller copies.
+#Returns the portraits that could not be found and make_portrait_variants
+def sync_portraits(portrait_paths, writer, pool=None, partial=False):
+    manifest = read_portrait_manifest()
+    new_manifest = {}
+    missing = []
+    to_copy = []
+    for portrait_name, portrait_path in portrait_paths.items():
+        source = find_portrait_source(portrait_path)
+        if(source is None):
+            missing.append((portrait_name, portrait_path))
+            continue
+        source_file, stat = source
+        dest_file = 'assets/images/portraits/' + portrait_name
+        entry = {'source': source_file, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        new_manifest[portrait_name] = entry
+        old_entry = manifest.get(portrait_name, {})
+        if('sha1' in old_entry and all(old_entry.get(key) == entry[key] for key in entry)
+           and os.path.isfile(dest_file) and os.path.getsize(dest_file) == stat.st_size):
+            entry['sha1'] = old_entry['sha1']
+            writer.keep(dest_file)
+        else:
+            to_copy.append((portrait_name, source_file, dest_file))
+    def copy_portrait(paths):
+        portrait_name, source_file, dest_file = paths
+        with open(source_file, 'rb') as f:
+            content = f.read()
+        new_manifest[portrait_name]['sha1'] = hashlib.sha1(content).hexdigest()
+        writer.write(dest_file, content)
+    with ThreadPoolExecutor() as thread_pool:
+        list(thread_pool.map(copy_portrait, to_copy))
+    variants = make_portrait_variants(new_manifest, manifest, writer, pool)
+    if(partial):
+        manifest.update(new_manifest)
+        new_manifest = manifest
+    os.makedirs(cache_path, exist_ok=True)
+    with open(cache_path + 'portraits.json', 'w') as f:
+        json.dump(new_manifest, f, indent=1, sort_keys=True)
+    return missing, variants
+
+#get the smaller copies to make of a portrait as (cache file, width, image 
+#format, file on the site). The width is in the cache name so resizing 
+#makes new copies
+def get_variant_files(portrait_name, sha1):
+    variants = get_portrait_variants(portrait_name)
+    variant_files = []
+    for variant, width in portrait_variants.items():
+        for variant_name in [variant, variant + '-webp']:
+            suffix = os.path.splitext(variants[variant_name])[1]
+            image_format = portrait_formats.get(suffix.lower(), 'WEBP')
+            variant_files.append((cache_path + 'portraits/' + sha1 + '-' + variant_name + '-' + 
+                                  str(width) + suffix, width, image_format,
+                                  'assets/images/portraits/variants/' + variants[variant_name]))
+    return variant_files
+
+#write the smaller copies of each portrait in manifest through writer, 
+#encoding on pool only those not already cached by sha1 or marked failed.
+#Returns a dictionary of portrait name to get_portrait_variants
+def make_portrait_variants(manifest, old_manifest, writer, pool=None):
+    variant_cache = cache_path + 'portraits/'
+    os.makedirs(variant_cache, exist_ok=True)
+    jobs = []
+    encoding = set()
+    to_write = []
+    variants = {}
+    for portrait_name, entry in manifest.items():
+        variant_files = get_variant_files(portrait_name, entry['sha1'])
+        cache_names = [os.path.basename(variant_file[0]) for variant_file in variant_files]
+        old_entry = old_manifest.get(portrait_name, {})
+        if(old_entry.get('sha1') == entry['sha1'] and old_entry.get('variants') == cache_names and
+           all(os.path.isfile(variant_file[3]) for variant_file in variant_files)):
+            for variant_file in variant_files:
+                writer.keep(variant_file[3])
+            entry['variants'] = cache_names
+            variants[portrait_name] = get_portrait_variants(portrait_name)
+            continue
+        to_write.append((portrait_name, entry, variant_files, cache_names))
+        targets = [variant_file[:3] for variant_file in variant_files 
+                   if not os.path.isfile(variant_file[0])]
+        failed_file = variant_cache + entry['sha1'] + '.failed'
+        #several people can share a portrait, but it only needs encoding once
+        if(len(targets) > 0 and entry['sha1'] not in encoding and 
+           not os.path.isfile(failed_file)):
+            encoding.add(entry['sha1'])
+            jobs.append((entry['source'], targets, failed_file))
+    if(len(jobs) > 0):
+        try:
+            #Pillow is only needed to make smaller copies of portraits
+            import PIL
+        except ImportError:
+            jobs = []
+    if(pool is None):
+        results = [encode_portrait(job) for job in jobs]
+    else:
+        results = pool.map(encode_portrait, jobs, threshold=parallel_encode_threshold)
+    for (source_file, targets, failed_file), encoded in zip(jobs, results):
+        if(not encoded):
+            print('Could not make smaller copies of portrait ' + source_file)
+            open(failed_file, 'w').close()
+    for portrait_name, entry, variant_files, cache_names in to_write:
+        if(not all(os.path.isfile(variant_file[0]) for variant_file in variant_files)):
+            continue
+        for cache_file, width, image_format, dest_file in variant_files:
+            with open(cache_file, 'rb') as f:
+                writer.write(dest_file, f.read())
+        entry['variants'] = cache_names
+        variants[portrait_name] = get_portrait_variants(portrait_name)
+    return variants
+
+#encode smaller copies of one portrait. job is the source file, a list of 
+#(file, width, image format) to make from it, and the file that marks it as
+#failed. Returns False if the source could not be read as an image
+def encode_portrait(job):
+    from PIL import Image
+    source_file, targets, failed_file = job
+    temp_file = None
+    try:
+        with Image.open(source_file) as image:
+            image.load()
+            if(image.mode not in ('RGB', 'RGBA', 'L', 'LA')):
+                image = image.convert('RGBA')
+            for cache_file, width, image_format in targets:
+                variant = image
+                if(variant.width > width):
+                    height = max(1, round(variant.height * width / variant.width))
+                    variant = variant.resize((width, height), Image.LANCZOS)
+                if(image_format == 'JPEG' and variant.mode != 'RGB'):
+                    variant = variant.convert('RGB')
+                #write to a temporary file first so a half written copy is
+                #never mistaken for a cached one
+                temp_file = cache_file + '.tmp'
+                variant.save(temp_file, image_format, quality=85)
+                os.replace(temp_file, cache_file)
+                temp_file = None
+    except (OSError, ValueError, Image.DecompressionBombError):
+        if(temp_file is not None and os.path.isfile(temp_file)):
+            os.remove(temp_file)
+        return False
+    return True
+
+#read the YAML front matter of a jekyll page into a dictionary. Only handles
+#key: value lines and lists as [a, b] or as - lines under the key
+def read_front_matter(file_path):
+    front_matter = {}
+    with open(file_path, encoding='utf-8') as f:
+        if(f.readline().strip() != '---'):
+            return front_matter
+        key = None
+        for line in f:
+            line = line.rstrip()
+            if(line == '---'):
+                break
+            if(line.lstrip().startswith('- ') and key is not None):
+                if(not isinstance(front_matter[key], list)):
+                    front_matter[key] = []
+                front_matter[key].append(line.lstrip()[2:].strip().strip('"\''))
+                continue
+            if(':' not in line or line.startswith('#')):
+                continue
+            key, value = line.split(':', 1)
+            key = key.strip()
+            value = value.strip()
+            if(value.startswith('[') and value.endswith(']')):
+                value = [item.strip().strip('"\'') for item in value[1:-1].split(',') 
+                         if item.strip() != '']
+            else:
+                value = value.strip('"\'')
+            front_matter[key] = value
+    return front_matter
+
+#index the TRO pages in tro_dir. Returns a dictionary of each page's slug 
+#(from its front matter, or its file name as jekyll does) to its url
+def index_tro(tro_dir):
+    tro_urls = {}
+    for file_path in sorted(glob.glob(tro_dir + '*')):
+        if(not os.path.isfile(file_path)):
+            continue
+        slug = read_front_matter(file_path).get('slug')
+        if(not slug):
+            slug = os.path.splitext(os.path.basename(file_path))[0]
+        tro_urls[slug] = '/tro/' + slug
+    return tro_urls
+
+#index the blog posts in posts_dir by the personnel and mission slugs in 
+#their front matter, as slug to the url, title, and date of its posts, 
+#newest first
+def index_posts(posts_dir):
+    posts = []
+    for file_path in glob.glob(posts_dir + '**/*', recursive=True):
+        match = re.match(r'(\d{4}-\d{2}-\d{2})-(.+)\.[^.]+$', os.path.basename(file_path))
+        if(match is None or not os.path.isfile(file_path)):
+            continue
+        front_matter = read_front_matter(file_path)
+        if(front_matter.get('published') == 'false'):
+            continue
+        date = front_matter.get('date', match.group(1))
+        categories = front_matter.get('categories', front_matter.get('category', []))
+        if(not isinstance(categories, list)):
+            categories = categories.split()
+        url = '/'
+        for category in dict.fromkeys(category.lower() for category in categories):
+            url += category + '/'
+        url += date[:10].replace('-', '/') + '/'
+        url += front_matter.get('slug', match.group(2)) + '.html'
+        if('permalink' in front_matter):
+            url = front_matter['permalink']
+        posts.append((date, file_path, front_matter, 
+                      {'url': url, 'title': front_matter.get('title', ''), 'date': date}))
+    related_posts = {'personnel': {}, 'missions': {}}
+    for date, file_path, front_matter, post in sorted(posts, reverse=True):
+        for key, index in [('personnel', related_posts['personnel']), 
+                           ('mission', related_posts['missions'])]:
+            slugs = front_matter.get(key, [])
+            if(not isinstance(slugs, list)):
+                slugs = [slugs]
+            for slug in slugs:
+                index.setdefault(slug, []).append(post)
+    return related_posts
+
+#index the roster pages (pages with the personnel layout) in roster_dir. 
+#Returns a list of (url, front matter) pairs
+def index_roster_pages(roster_dir):
+    roster_pages = []
+    for file_path in sorted(glob.glob(roster_dir + '*.md')):
+        front_matter = read_front_matter(file_path)
+        if(front_matter.get('layout') != 'personnel'):
+            continue
+        url = front_matter.get('permalink', 
+                               '/' + os.path.splitext(os.path.normpath(file_path))[0] + '.html')
+        roster_pages.append((url, front_matter))
+    return roster_pages
+
+#wraps a file so that the wall and CPU time spent reading from it, which for
+#a gzip file is mostly decompression, is added up in timings
+class TimedReader:
+    def __init__(self, source, timings):
+        self.source = source
+        self.timings = timings
+        timings.setdefault('wall', 0.0)
+        timings.setdefault('cpu', 0.0)
+
+    def read(self, size=-1):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        data = self.source.read(size)
+        self.timings['wall'] += time.perf_counter() - wall
+        self.timings['cpu'] += time.process_time() - cpu
+        return data
+
+#load the sections in section_names from a campaign file, keyed by tag. 
+#Sections in record_readers come back as a list of records, each read and 
+#thrown away as soon as it is parsed so the file is never held in memory
+def load_campaign_sections(file_path, section_names, read_timings=None, record_readers=None):
+    if(file_path.endswith("gz")):
+        source = gzip.open(file_path, 'rb')
+    else:
+        source = open(file_path, 'rb')
+    if(record_readers is None):
+        record_readers = {}
+    sections = {}
+    with source:
+        if(read_timings is not None):
+            source = TimedReader(source, read_timings)
+        if(not stream_campaign):
+            campaign = ET.parse(source).getroot()
+            for name in section_names:
+                section = campaign.find(name)
+                if(section is not None and name in record_readers):
+                    tag, read_record = record_readers[name]
+                    section = [read_record(record) for record in section.findall(tag)]
+                sections[name] = section
+            return sections
+        #records read so far from the section being parsed
+        records = []
+        #stack of currently open elements, starting with the campaign root
+        stack = []
+        for event, ele in ET.iterparse(source, events=('start', 'end')):
+            if(event == 'start'):
+                stack.append(ele)
+                continue
+            stack.pop()
+            depth = len(stack)
+            if(depth == 0):
+                continue
+            parent = stack[-1]
+            section = stack[1].tag if depth > 1 else ele.tag
+            if(depth == 1):
+                #a completed top-level section
+                if(section in section_names):
+                    sections[section] = records if section in record_readers else ele
+                records = []
+            elif(section in section_names):
+                if(depth == 2 and section in record_readers):
+                    #a completed record, which is dropped once it is read
+                    tag, read_record = record_readers[section]
+                    if(ele.tag == tag):
+                        records.append(read_record(ele))
+                else:
+                    if(depth == 3 and section == 'units' and ele.tag == 'entity'):
+                        #keep only what we need to name the unit
+                        attrib = {k: ele.attrib[k] for k in ('chassis', 'model') if k in ele.attrib}
+                        ele.clear()
+                        ele.attrib.update(attrib)
+                    if(depth < 4 or section != 'units' or stack[3].tag != 'entity'):
+                        continue
+            #the element just closed is always the last child of its parent,
+            #so drop it from the tree now that we are done with it
+            del parent[-1]
+    for name in section_names:
+        sections.setdefault(name, None)
+    return sections
+
+# ----------------------------------------------------------------------------
+# Campaign model
+# ----------------------------------------------------------------------------
+
+#compact records for everything we use from a campaign file. load_campaign 
+#puts them together into a Campaign, so other scripts can use it directly
+
+#custom class for a single force in the TO&E. parent_name and parent_slug
+#are None for the top-level force, whose full name is empty
+class Force:
+    __slots__ = ('force_id', 'name', 'full_name', 'slug', 'parent_name', 
+                 'parent_slug', 'depth', 'desc', 'unit_ids')
+
+    def __init__(self, force_id, name, full_name, slug, parent_name, parent_slug, depth, desc, unit_ids):
+        self.force_id = force_id
+        self.name = name
+        self.full_name = full_name
+        self.slug = slug
+        self.parent_name = parent_name
+        self.parent_slug = parent_slug
+        self.depth = depth
+        self.desc = desc
+        self.unit_ids = unit_ids
+
+#walk the forces tree once and flatten it into a list of Force objects in 
+#TO&E order
+def read_forces(forces_ele):
+    force_list = []
+    add_forces(forces_ele, None, None, 0, force_list)
+    return force_list
+
+#get the ids of the units in a force's units element
+def get_force_unit_ids(units):
+    if(units is None):
+        return []
+    return [unit.attrib['id'] for unit in units if unit.tag == 'unit']
+
+force_reader = RecordReader([('name', get_xml_text), ('desc', get_xml_text),
+                             ('units', get_force_unit_ids), 
+                             ('subforces', get_xml_element)])
+
+#add all the forces identified in element list to force_list. At the end it
+#calls itself to iteratively process the tree
+def add_forces(forces_ele, parent_name, parent_slug, depth, force_list):
+    for force_ele in forces_ele:
+        if(force_ele.tag != 'force'):
+            continue
+        short_force_name, desc, unit_ids, subforces = force_reader.read(force_ele)
         if(parent_name is not None):
             if(parent_name == ''):
                 full_force_name = short_force_name
@@ -229,85 +928,474 @@ def process_forces(forces_ele, parent_name, parent_slug):
             #top level force so special things
             full_force_name = ''
             slug = urlify(short_force_name)
-        force_desc = get_xml_text(force.find('desc'))
-        f = open('campaign/_forces/' + slug + '.md', 'w')
+        force_list.append(Force(force_ele.attrib['id'], short_force_name, full_force_name, 
+                                slug, parent_name, parent_slug, depth, desc, unit_ids))
+        if(subforces is not None):
+            add_forces(subforces, full_force_name, slug, depth + 1, force_list)
+
+#build a dictionary of unit id to the Force it belongs to
+def index_force_units(force_list):
+    unit_forces = {}
+    for force in force_list:
+        for unit_id in force.unit_ids:
+            #if a unit is listed in more than one force, the first wins
+            unit_forces.setdefault(unit_id, force)
+    return unit_forces
+
+#custom class for a unit. name is '' if the unit has no entity, and crew is
+#the uuids of the people in its crew slots
+class Unit:
+    __slots__ = ('unit_id', 'name', 'crew')
+
+    def __init__(self, unit_id, name, crew):
+        self.unit_id = unit_id
+        self.name = name
+        self.crew = crew
+
+#get the name of a unit from its entity element, or '' if it has none
+def get_entity_name(entity):
+    if(entity is None):
+        return ''
+    return entity.attrib['chassis'] + ' ' + entity.attrib['model']
+
+unit_reader = RecordReader([('entity', get_entity_name), (tuple(crew_tags), get_xml_text)],
+                           lists=crew_tags)
+
+def read_unit(unit):
+    name, crew = unit_reader.read(unit)
+    return Unit(unit.attrib['id'], name, [uuid for uuid in crew if uuid != ''])
+
+#custom class for a person. Values are kept as MekHQ has them, other than
+#being converted to the right type, and it is up to the export to decide
+#how to show them. skills is a dictionary of skill name to (level, bonus)
+class Person:
+    __slots__ = ('uuid', 'name', 'role', 'status', 'birthdate', 'deathdate', 
+                 'clan', 'phenotype', 'rank', 'rank_system', 'callsign', 
+                 'portrait_path', 'portrait_file', 'bio', 'skills')
+
+    def __init__(self, uuid, name, role, status, birthdate, deathdate, clan, 
+                 phenotype, rank, rank_system, callsign, portrait_path, 
+                 portrait_file, bio, skills):
+        self.uuid = uuid
+        self.name = name
+        self.role = role
+        self.status = status
+        self.birthdate = birthdate
+        self.deathdate = deathdate
+        self.clan = clan
+        self.phenotype = phenotype
+        self.rank = rank
+        self.rank_system = rank_system
+        self.callsign = callsign
+        self.portrait_path = portrait_path
+        self.portrait_file = portrait_file
+        self.bio = bio
+        self.skills = skills
+
+portrait_reader = RecordReader([('category', get_portrait_path), 
+                                ('filename', get_portrait_file)])
+
+#get the path (relative to a portraits directory) and file name of a 
+#person's portrait from their portrait element
+def get_portrait(portrait):
+    if(portrait is None):
+        return '', ''
+    portrait_dir, portrait_file = portrait_reader.read(portrait)
+    return portrait_dir + portrait_file, portrait_file
+
+skill_reader = RecordReader([('type', get_xml_text), ('level', get_xml_int), 
+                             ('bonus', get_xml_int)])
+
+person_reader = RecordReader([
+    ('id', get_xml_text), ('givenName', get_xml_text), ('surname', get_xml_text),
+    ('bloodname', get_xml_text), ('name', get_xml_text), ('primaryRole', get_xml_text),
+    ('status', get_xml_text), ('birthday', get_xml_date), ('deathday', get_xml_date),
+    ('clan', get_xml_bool), ('phenotype', get_xml_text), ('rank', get_xml_int),
+    ('rankSystem', get_xml_text), ('callsign', get_xml_text), ('portrait', get_portrait),
+    ('biography', get_xml_text), ('skill', skill_reader.read)], lists=['skill'])
+
+def read_person(person):
+    (uuid, first, surname, bloodname, name, role, status, birthdate, deathdate, 
+     clan, phenotype, rank, rank_system, callsign, (portrait_path, portrait_file), 
+     bio, skills) = person_reader.read(person)
+    if(name == ''):
+        name = first
+        if(surname != ''):
+            name = name + ' ' + surname
+    if(bloodname != '' and surname == ''):
+        name = name + ' ' + bloodname
+    skills = {skill_name: (level, bonus) for skill_name, level, bonus in skills}
+    return Person(uuid, name, role, status, birthdate, deathdate, clan, phenotype, 
+                  rank, rank_system, callsign, portrait_path, portrait_file, bio, 
+                  skills)
+
+#custom classes for a mission and its scenarios. scenario_id is None for
+#scenarios saved without one
+class Mission:
+    __slots__ = ('mission_id', 'name', 'mission_type', 'desc', 'start', 'end', 
+                 'employer', 'location', 'status', 'scenarios')
+
+    def __init__(self, mission_id, name, mission_type, desc, start, end, 
+                 employer, location, status, scenarios):
+        self.mission_id = mission_id
+        self.name = name
+        self.mission_type = mission_type
+        self.desc = desc
+        self.start = start
+        self.end = end
+        self.employer = employer
+        self.location = location
+        self.status = status
+        self.scenarios = scenarios
+
+class Scenario:
+    __slots__ = ('scenario_id', 'name', 'desc', 'report', 'date', 'status')
+
+    def __init__(self, scenario_id, name, desc, report, date, status):
+        self.scenario_id = scenario_id
+        self.name = name
+        self.desc = desc
+        self.report = report
+        self.date = date
+        self.status = status
+
+scenario_reader = RecordReader([('name', get_xml_text), ('desc', get_xml_text), 
+                                ('report', get_xml_text), ('date', get_xml_date), 
+                                ('status', get_xml_text)])
+
+#read the Scenarios in a mission's scenarios element
+def read_scenarios(scenarios):
+    if(scenarios is None):
+        return []
+    return [Scenario(scenario.attrib.get('id'), *scenario_reader.read(scenario))
+            for scenario in scenarios if scenario.tag == 'scenario']
+
+mission_reader = RecordReader([
+    ('name', get_xml_text), ('type', get_xml_text), ('desc', get_xml_text), 
+    ('startDate', get_xml_date), ('endDate', get_xml_date), ('employer', get_xml_text), 
+    ('systemId', get_xml_text), ('status', get_xml_text), ('scenarios', read_scenarios)])
+
+def read_mission(mission):
+    return Mission(mission.attrib['id'], *mission_reader.read(mission))
+
+#custom class for a whole campaign. skill_types is keyed by skill name,
+#units by unit id, and kills is a KillTally
+class Campaign:
+    __slots__ = ('name', 'date', 'rank_system', 'custom_ranks', 'skill_types', 
+                 'personnel', 'units', 'forces', 'missions', 'kills')
+
+    def __init__(self, name, date, rank_system, custom_ranks, skill_types, 
+                 personnel, units, forces, missions, kills):
+        self.name = name
+        self.date = date
+        self.rank_system = rank_system
+        self.custom_ranks = custom_ranks
+        self.skill_types = skill_types
+        self.personnel = personnel
+        self.units = units
+        self.forces = forces
+        self.missions = missions
+        self.kills = kills
+
+#load everything we use from the campaign file at file_path into a Campaign.
+#Sections left out of section_names are left empty (info is always needed)
+def load_campaign(file_path, read_timings=None, section_names=campaign_sections):
+    #each record is read as soon as it has been parsed
+    record_readers = {
+        'skillTypes': ('skillType', read_skill_type),
+        'personnel': ('person', read_person),
+        'units': ('unit', read_unit),
+        'missions': ('mission', read_mission),
+        'kills': ('kill', kill_reader.read)
+    }
+    sections = load_campaign_sections(file_path, section_names, read_timings, record_readers)
+    for name in record_readers:
+        if(sections.get(name) is None):
+            sections[name] = []
+    info = sections['info']
+    rank_system = info.find('rankSystem')
+    skill_types = {}
+    for skill_type in sections['skillTypes']:
+        skill_types[skill_type.name] = skill_type
+    units = {}
+    for unit in sections['units']:
+        units[unit.unit_id] = unit
+    force_list = []
+    if(sections.get('forces') is not None):
+        force_list = read_forces(sections['forces'])
+    return Campaign(get_xml_text(info.find('name')),
+                    datetime.datetime.strptime(info.find('calendar').text, '%Y-%m-%d'),
+                    get_xml_text(rank_system.find('system')), 
+                    process_rank_system(rank_system), skill_types,
+                    sections['personnel'], units, force_list, sections['missions'],
+                    tally_kills(sections['kills']))
+
+#loop through all the forces in force_list and output them to markdown files
+def process_forces(force_list, writer):
+    for force in force_list:
+        f = writer.open('campaign/_forces/' + force.slug + '.md')
         f.write('---\n')
         f.write('layout: force\n')
-        f.write('title: ' + short_force_name + '\n')
-        f.write('order: ' + force.attrib['id'] + '\n')
-        f.write('slug: ' + slug + '\n')
-        if(parent_name is not None):
-            f.write('parent-name: ' + parent_name + '\n')
-            f.write('parent-slug: ' + parent_slug + '\n')
+        f.write('title: ' + force.name + '\n')
+        f.write('order: ' + force.force_id + '\n')
+        f.write('slug: ' + force.slug + '\n')
+        if(force.parent_name is not None):
+            f.write('parent-name: ' + force.parent_name + '\n')
+            f.write('parent-slug: ' + force.parent_slug + '\n')
         f.write('---\n\n')
-        f.write(unescape(force_desc))
+        f.write(unescape(force.desc))
         f.close()
-        subforces = force.find('subforces')
-        if(subforces is not None):
-            process_forces(subforces, full_force_name, slug)
 
-#loop through forces and find the force that the unit uuid is a member of, 
-#iteratively recursing through the subforces
-def find_force(uuid, forces_ele, parent_name, parent_slug):
-    for force in forces_ele.findall('force'):
-        short_force_name = force.find('name').text
-        if(parent_name is not None):
-            if(parent_name == ''):
-                full_force_name = short_force_name
-            else:
-                full_force_name = parent_name + ', ' + short_force_name
-            slug = urlify(full_force_name)
+#build the TO&E tree for _data/toe.json, with units sorted by the rank of 
+#their crew. Also returns the list of indices leading to each force, since 
+#jekyll cannot search the tree
+def build_toe(force_list, people, unit_forces, unit_names, tro_urls):
+    crews = {}
+    for record, slug, portrait_file in people:
+        if(record.unit_id is not None and record.force_slug is not None):
+            person = {
+                'title': record.title,
+                'slug': slug,
+                'url': '/personnel/' + slug + '.html',
+                'portrait': portrait_file,
+                'rank-number': int(record.rank_number)
+            }
+            for variant, variant_file in record.portrait_variants:
+                person['portrait-' + variant] = variant_file
+            crews.setdefault(record.unit_id, []).append(person)
+    top_forces = []
+    force_nodes = {}
+    for force in force_list:
+        units = []
+        for unit_id in force.unit_ids:
+            if(unit_id not in crews or unit_forces.get(unit_id) is not force):
+                continue
+            crew = sorted(crews[unit_id], key=lambda person: -person['rank-number'])
+            unit = {'id': unit_id, 'name': unit_names[unit_id], 
+                    'slug': urlify(unit_names[unit_id]), 'crew': crew}
+            if(unit['slug'] in tro_urls):
+                unit['tro-url'] = tro_urls[unit['slug']]
+            units.append(unit)
+        units.sort(key=lambda unit: -unit['crew'][0]['rank-number'])
+        node = {'name': force.name, 'slug': force.slug, 'order': int(force.force_id),
+                'desc': unescape(force.desc), 'forces': [], 'units': units}
+        force_nodes[force.slug] = node
+        if(force.parent_slug is None):
+            top_forces.append(node)
         else:
-            #top level force so special things
-            full_force_name = ''
-            slug = urlify(short_force_name)
-        units = force.find('units')
-        if(units is not None):
-            for unit in units.findall('unit'):
-                if(unit.attrib['id'] == uuid):
-                    return full_force_name
-        subforces = force.find('subforces')
-        if(subforces is not None):
-            found_name = find_force(uuid, subforces, full_force_name, slug)
-            if(found_name is not None):
-                return found_name
-    return None
+            force_nodes[force.parent_slug]['forces'].append(node)
+    paths = {}
+    add_toe_paths(top_forces, [], paths)
+    return top_forces, paths
+
+#sort each level of the TO&E tree by order and record the path to each force
+def add_toe_paths(force_nodes, path, paths):
+    force_nodes.sort(key=lambda node: node['order'])
+    for i, node in enumerate(force_nodes):
+        paths[node['slug']] = path + [i]
+        add_toe_paths(node['forces'], path + [i], paths)
 
+#work out the statistics of each force and its subforces for 
+#_data/force_stats.json. People without a unit, as most casualties are, 
+#count toward the top-level force
+def build_force_stats(force_list, people, skill_ratings, unit_forces, unit_names):
+    totals = {}
+    for force in force_list:
+        totals[force.slug] = {'headcount': dict.fromkeys(personnel_status_names, 0),
+                              'kills': 0, 'units': 0, 'levels': 0, 'rated': 0,
+                              'unassigned': 0}
+    top_slug = force_list[0].slug if len(force_list) > 0 else None
+    for unit_id, force in unit_forces.items():
+        if(unit_id in unit_names):
+            totals[force.slug]['units'] += 1
+    for record, slug, portrait_file in people:
+        if(record.force_slug is not None):
+            total = totals[record.force_slug]
+        elif(top_slug is not None):
+            total = totals[top_slug]
+            total['unassigned'] += 1
+        else:
+            continue
+        total['headcount'][record.status] = total['headcount'].get(record.status, 0) + 1
+        total['kills'] += record.kill_count
+        rating = skill_ratings.get(record.uuid)
+        if(rating is not None):
+            total['levels'] += rating[0]
+            total['rated'] += 1
+    #subforces always come after their parent in force_list, so going through
+    #it backwards adds each force to its parent after all of its own 
+    #subforces have been added to it
+    for force in reversed(force_list):
+        if(force.parent_slug is None):
+            continue
+        total = totals[force.slug]
+        parent = totals[force.parent_slug]
+        for status, count in total['headcount'].items():
+            parent['headcount'][status] = parent['headcount'].get(status, 0) + count
+        for key in ['kills', 'units', 'levels', 'rated']:
+            parent[key] += total[key]
+    force_stats = {}
+    for force in force_list:
+        total = totals[force.slug]
+        experience = None
+        experience_level = None
+        if(total['rated'] > 0):
+            experience = round(total['levels'] / total['rated'], 2)
+            experience_level = skill_level_names[int(total['levels'] / total['rated'])]
+        force_stats[force.slug] = {
+            'name': force.full_name or force.name,
+            'personnel': sum(total['headcount'].values()),
+            'headcount': total['headcount'],
+            'casualties': sum(total['headcount'][status] for status in casualty_statuses),
+            'kills': total['kills'],
+            'units': total['units'],
+            'unassigned': total['unassigned'],
+            'experience': experience,
+            'experience-level': experience_level
+        }
+    return force_stats
+
+#build the roster for each roster page from people, split into pages of 
+#roster_page_size. Writes an extra page for each page after the first and 
+#returns a dictionary of roster page url to its roster
+def build_rosters(people, roster_pages, writer):
+    ranked_people = sorted(people, key=lambda person: -int(person[0].rank_number))
+    rosters = {}
+    for url, front_matter in roster_pages:
+        status = front_matter.get('status', '')
+        roles = front_matter.get('roles')
+        roster = []
+        for record, slug, portrait_file in ranked_people:
+            if(record.status not in status or (roles is not None and record.role not in roles)):
+                continue
+            person = {'title': record.title, 'url': '/personnel/' + slug + '.html', 
+                      'role-name': record.role_name}
+            if(portrait_file is not None):
+                person['portrait'] = portrait_file
+                for variant, variant_file in record.portrait_variants:
+                    person['portrait-' + variant] = variant_file
+            if(record.skill_desc is not None):
+                person['skill-level'] = record.skill_desc[0]
+                person['skill-detail'] = record.skill_desc[1]
+            if(record.phenotype != ''):
+                person['phenotype'] = record.phenotype
+            if(record.callsign != ''):
+                person['callsign'] = record.callsign
+            if(record.unit_name is not None):
+                person['unit'] = record.unit_name
+                if(record.tro_url is not None):
+                    person['tro-url'] = record.tro_url
+            if(record.force_name is not None):
+                person['force'] = record.force_name
+                person['force-slug'] = record.force_slug
+            roster.append(person)
+        pages = []
+        base_url = os.path.splitext(url.rstrip('/'))[0]
+        for start in range(0, max(len(roster), 1), roster_page_size):
+            page_number = str(len(pages) + 1)
+            if(start == 0):
+                page_url = url
+            else:
+                page_url = base_url + '-' + page_number + '.html'
+                f = writer.open('personnel-roles/pages/' + base_url.strip('/').replace('/', '-') + 
+                                '-' + page_number + '.md')
+                f.write('---\n')
+                f.write('layout: personnel\n')
+                f.write('title: ' + front_matter.get('title', '') + '\n')
+                f.write('roster-url: ' + url + '\n')
+                f.write('roster-page: ' + page_number + '\n')
+                f.write('permalink: ' + page_url + '\n')
+                f.write('---\n')
+                f.close()
+            pages.append({'url': page_url, 'people': roster[start:start + roster_page_size]})
+        rosters[url] = {'count': len(roster), 'pages': pages}
+    return rosters
+
+#rank group (the position in a rank's comma separated list of names) used 
+#for each role. Any role not listed uses the Mechwarrior group
+rank_groups = {
+    "AEROSPACE_PILOT" : 1,
+    "CONVENTIONAL_AIRCRAFT_PILOT" : 1,
+    "GROUND_VEHICLE_DRIVER" : 2,
+    "NAVAL_VEHICLE_DRIVER" : 2,
+    "VTOL_PILOT" : 2,
+    "VEHICLE_GUNNER" : 2,
+    "VEHICLE_CREW" : 2,
+    "VESSEL_PILOT" : 3,
+    "VESSEL_CREW" : 3,
+    "VESSEL_GUNNER" : 3,
+    "VESSEL_NAVIGATOR" : 3,
+    "BATTLE_ARMOUR" : 4,
+    "SOLDIER" : 4,
+    "MECH_TECH" : 5,
+    "MECHANIC" : 5,
+    "AERO_TECH" : 5,
+    "BA_TECH" : 5,
+    "ASTECH" : 5
+}
+
+#rank names that say to use the name from another rank group instead
+rank_redirects = {
+    "--MW" : 0,
+    "--ASF" : 1,
+    "--VEE" : 2,
+    "--NAVAL" : 3,
+    "--INF" : 4,
+    "--TECH" : 5
+}
+
+#look up the name of a rank in the compiled rank table. Returns None if
+#the rank has no name
 def find_rank(rank_level, rank_system, role):
-    if(role in ["AEROSPACE_PILOT","CONVENTIONAL_AIRCRAFT_PILOT"]):
-        rank = all_rank_lists[rank_system][1][rank_level]
-    elif(role in ["GROUND_VEHICLE_DRIVER", "NAVAL_VEHICLE_DRIVER", "VTOL_PILOT", "VEHICLE_GUNNER","VEHICLE_CREW"]):
-        rank = all_rank_lists[rank_system][2][rank_level]
-    elif(role in [ "VESSEL_PILOT", "VESSEL_CREW", "VESSEL_GUNNER", "VESSEL_NAVIGATOR"]):
-        rank = all_rank_lists[rank_system][3][rank_level]
-    elif(role in ["BATTLE_ARMOUR","SOLDIER"]):
-        rank = all_rank_lists[rank_system][4][rank_level]
-    elif(role in ["MECH_TECH", "MECHANIC", "AERO_TECH", "BA_TECH", "ASTECH"]):
-        rank = all_rank_lists[rank_system][5][rank_level]
-    else:
-        rank = all_rank_lists[rank_system][0][rank_level]
-    rank = check_rank(rank, rank_level, all_rank_lists[rank_system])
-    if(rank == '-' or rank == "None"):
+    return rank_table.get((rank_system, rank_groups.get(role, 0), rank_level))
+
+#follow any redirects for a rank name to the name that should actually be
+#used, returning None if the rank has no name
+def resolve_rank(rank, rank_level, rank_list):
+    seen = set()
+    while(rank in rank_redirects and rank not in seen):
+        seen.add(rank)
+        group = rank_list[rank_redirects[rank]]
+        if(rank_level >= len(group)):
+            return None
+        rank = group[rank_level]
+    if(rank == '-' or rank == "None" or rank in rank_redirects):
         return None
-    else:
-        return rank
-    
-def check_rank(rank, rank_level, rank_list):
-    if(rank == '--MW'):
-        rank = rank_list[0][rank_level]
-    elif(rank == '--ASF'):
-        rank = rank_list[1][rank_level]
-    elif(rank == '--VEE'):
-        rank = rank_list[2][rank_level]
-    elif(rank == '--NAVAL'):
-        rank = rank_list[3][rank_level]
-    elif(rank == '--INF'):
-        rank = rank_list[4][rank_level]
-    elif(rank == '--TECH'):
-        rank = rank_list[5][rank_level]
-    else:
-        return rank
-    return check_rank(rank, rank_level, rank_list)
+    return rank
+
+#add every rank of a processed rank system to table, keyed by 
+#(rank system code, rank group, rank level), with redirects already resolved
+def compile_rank_system(code, rank_list, table):
+    for group, ranks in enumerate(rank_list):
+        for rank_level, rank in enumerate(ranks):
+            table[(code, group, rank_level)] = resolve_rank(rank, rank_level, rank_list)
+
+#load the compiled rank table for all the rank systems in ranks_file. The
+#compiled table is cached in the cache directory and reused until ranks_file 
+#changes, so that we only need to parse the xml when it does
+def load_rank_table(ranks_file):
+    source = os.path.abspath(ranks_file)
+    if(source in shared_rank_tables):
+        return shared_rank_tables[source]
+    cache_file = cache_path + 'ranks.pickle'
+    mtime = os.stat(ranks_file).st_mtime_ns
+    try:
+        with open(cache_file, 'rb') as f:
+            cache = pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError):
+        cache = {}
+    if(cache.get(source, (None, None))[0] == mtime):
+        return cache[source][1]
+    table = {}
+    rank_systems = ET.parse(ranks_file).getroot()
+    for rank_system in rank_systems.findall('rankSystem'):
+        code = get_xml_text(rank_system.find('code'))
+        compile_rank_system(code, process_rank_system(rank_system), table)
+    cache[source] = (mtime, table)
+    os.makedirs(cache_path, exist_ok=True)
+    with open(cache_file, 'wb') as f:
+        pickle.dump(cache, f)
+    return table
 
 def process_rank_system(rsystem):
     rank_mw    = []
@@ -328,6 +1416,8 @@ def process_rank_system(rsystem):
 
 #custom class for skill type
 class SkillType:
+    __slots__ = ('name', 'target', 'count_up', 'green', 'reg', 'vet', 'elite')
+
     def __init__(self, name, target, count_up, green, reg, vet, elite):
         self.name = name
         self.target = target
@@ -337,12 +1427,12 @@ class SkillType:
         self.vet = vet
         self.elite = elite
     
-    def get_target_desc(self, skill):
+    def get_target_desc(self, level, bonus):
         if(self.count_up):
-            value = self.target + skill.level + skill.bonus
+            value = self.target + level + bonus
             return '+' + str(value)
         else:
-            value = self.target - (skill.level  + skill.bonus)
+            value = self.target - (level + bonus)
             return str(value) + '+'
     
     def get_skill_level(self, level):
@@ -356,364 +1446,1194 @@ class SkillType:
             return 1
         else:
             return 0
-            
-class Skill:
-    def __init__(self, name, level, bonus):
-        self.name = name
-        self.level = level
-        self.bonus = bonus
-
-def get_skill_desc(sk1, sk2):
-    if(sk1 is None):
-        return None
-    lvl = skill_dict[sk1.name].get_skill_level(sk1.level)
-    tgt_desc = skill_dict[sk1.name].get_target_desc(sk1)
-    if(sk2 is not None):
-        lvl2 = skill_dict[sk2.name].get_skill_level(sk2.level)
-        lvl = int((lvl+lvl2)/2)
-        tgt_desc = tgt_desc + "/" + skill_dict[sk2.name].get_target_desc(sk2)
-        tgt_desc = re.sub(r"\+", '', tgt_desc)
-    return [skill_level_names[lvl], tgt_desc]
-    
-def get_skill_report(person):
-    role = person.find('primaryRole').text
-    skills = {}
-    for skill in person.findall('skill'):
-        sk_name = get_xml_text(skill.find('type'))
-        sk_lvl = int(get_xml_text(skill.find('level')))
-        sk_bns = int(get_xml_text(skill.find('bonus')))
-        skills[sk_name] = Skill(sk_name, sk_lvl, sk_bns)
-    sk1 = None
-    sk2 = None
-    if(role == "MECHWARRIOR"):
-        if('Gunnery/Mech' in skills):
-            sk1 = skills['Gunnery/Mech']
-        if('Piloting/Mech' in skills):
-            sk2 = skills['Piloting/Mech']
-    elif(role == "AEROSPACE_PILOT"):
-        if('Gunnery/Aerospace' in skills):
-            sk1 = skills['Gunnery/Aerospace']
-        if('Piloting/Aerospace' in skills):
-            sk2 = skills['Piloting/Aerospace']
-    elif(role == "GROUND_VEHICLE_DRIVER"):
-        if('Piloting/Ground Vehicle' in skills):
-            sk1 = skills['Piloting/Ground Vehicle']
-    elif(role == "NAVAL_VEHICLE_DRIVER"):
-        if('Piloting/Naval' in skills):
-            sk1 = skills['Piloting/Naval']
-    elif(role == "VTOL_PILOT"):
-        if('Piloting/VTOL' in skills):
-            sk1 = skills['Piloting/VTOL']
-    elif(role == "VEHICLE_GUNNER"):
-        if('Gunnery/Vehicle' in skills):
-            sk1 = skills['Gunnery/Vehicle']
-    elif(role == "BATTLE_ARMOUR"):
-        if('Gunnery/Battlesuit' in skills):
-            sk1 = skills['Gunnery/Battlesuit']
-        if('Anti-Mech' in skills):
-            sk2 = skills['Anti-Mech']
-    elif(role == "SOLDIER"):
-        if('Small Arms' in skills):
-            sk1 = skills['Small Arms']
-    elif(role == "PROTOMECH_PILOT"):
-        if('Gunnery/Protomech' in skills):
-            sk1 = skills['Gunnery/Protomech']
-    elif(role == "CONVENTIONAL_AIRCRAFT_PILOT"):
-        if('Gunnery/Aircraft' in skills):
-            sk1 = skills['Gunnery/Aircraft']
-        if('Piloting/Jet' in skills):
-            sk2 = skills['Piloting/Jet']
-    elif(role == "VESSEL_PILOT"):
-        if('Piloting/Aircraft' in skills):
-            sk1 = skills['Piloting/Spacecraft']
-    elif(role == "VESSEL_CREW"):
-        if('Tech/Vessel' in skills):
-            sk1 = skills['Tech/Vessel']
-    elif(role == "VESSEL_GUNNER"):
-        if('Gunnery/Spacecraft' in skills):
-            sk1 = skills['Gunnery/Spacecraft']
-    elif(role == "VESSEL_NAVIGATOR"):
-        if('Hyperspace Navigator' in skills):
-            sk1 = skills['Hyperspace Navigation']
-    elif(role == "MECH_TECH"):
-        if('Tech/Mech' in skills):
-            sk1 = skills['Tech/Mech']
-    elif(role == "MECHANIC"):
-        if('Tech/Mechanic' in skills):
-            sk1 = skills['Tech/Mechanic']
-    elif(role == "AERO_TECH"):
-        if('Tech/Aero' in skills):
-            sk1 = skills['Tech/Aero']
-    elif(role == "BA_TECH"):
-        if('Tech/BA' in skills):
-            sk1 = skills['Tech/BA']
-    elif(role == "ASTECH"):
-        if('Astech' in skills):
-            sk1 = skills['Astech']
-    elif(role == "DOCTOR"):
-        if('Doctor' in skills):
-            sk1 = skills['Doctor']
-    elif(role == "MEDIC"):
-        if('Medtech' in skills):
-            sk1 = skills['Medtech']
-    elif(role == "ADMINISTRATOR_COMMAND" or role == "ADMINISTRATOR_LOGISTICS" or role == "ADMINISTRATOR_TRANSPORT" or role == "ADMINISTRATOR_HR"):
-        if('Administration' in skills):
-            sk1 = skills['Administration']
-    return get_skill_desc(sk1, sk2)
 
-# ----------------------------------------------------------------------------
-# Remove old files to start fresh
-# ----------------------------------------------------------------------------
+skill_type_reader = RecordReader([
+    ('name', get_xml_text), ('target', get_xml_int), ('countUp', get_xml_bool),
+    ('greenLvl', get_xml_int), ('regLvl', get_xml_int), ('vetLvl', get_xml_int),
+    ('eliteLvl', get_xml_int)])
 
-files = glob.glob('campaign/_forces/*')
-for f in files:
-    os.remove(f)
-    
-files = glob.glob('campaign/_missions/*')
-for f in files:
-    os.remove(f)
-    
-files = glob.glob('campaign/_personnel/*')
-for f in files:
-    os.remove(f)
-    
-files = glob.glob('campaign/_scenarios/*')
-for f in files:
-    os.remove(f)
-    
-files = glob.glob('assets/images/portraits/*')
-for f in files:
-    os.remove(f)
+def read_skill_type(skill_type):
+    return SkillType(*skill_type_reader.read(skill_type))
 
-# ----------------------------------------------------------------------------
-# Load the file and top-level information
-# ----------------------------------------------------------------------------
+#the primary and (optional) secondary skill used to rate each role. Roles 
+#that are not listed here do not get a skill rating
+role_skills = {
+    "MECHWARRIOR" : ("Gunnery/Mech", "Piloting/Mech"),
+    "AEROSPACE_PILOT" : ("Gunnery/Aerospace", "Piloting/Aerospace"),
+    "GROUND_VEHICLE_DRIVER" : ("Piloting/Ground Vehicle",),
+    "NAVAL_VEHICLE_DRIVER" : ("Piloting/Naval",),
+    "VTOL_PILOT" : ("Piloting/VTOL",),
+    "VEHICLE_GUNNER" : ("Gunnery/Vehicle",),
+    "BATTLE_ARMOUR" : ("Gunnery/Battlesuit", "Anti-Mech"),
+    "SOLDIER" : ("Small Arms",),
+    "PROTOMECH_PILOT" : ("Gunnery/Protomech",),
+    "CONVENTIONAL_AIRCRAFT_PILOT" : ("Gunnery/Aircraft", "Piloting/Jet"),
+    "VESSEL_PILOT" : ("Piloting/Spacecraft",),
+    "VESSEL_CREW" : ("Tech/Vessel",),
+    "VESSEL_GUNNER" : ("Gunnery/Spacecraft",),
+    "VESSEL_NAVIGATOR" : ("Hyperspace Navigation",),
+    "MECH_TECH" : ("Tech/Mech",),
+    "MECHANIC" : ("Tech/Mechanic",),
+    "AERO_TECH" : ("Tech/Aero",),
+    "BA_TECH" : ("Tech/BA",),
+    "ASTECH" : ("Astech",),
+    "DOCTOR" : ("Doctor",),
+    "MEDIC" : ("Medtech",),
+    "ADMINISTRATOR_COMMAND" : ("Administration",),
+    "ADMINISTRATOR_LOGISTICS" : ("Administration",),
+    "ADMINISTRATOR_TRANSPORT" : ("Administration",),
+    "ADMINISTRATOR_HR" : ("Administration",)
+}
 
-if campaign_file.endswith("gz"):
-    gzipper = gzip.GzipFile(mekhq_path + 'campaigns/' + campaign_file)
-    data = gzipper.read()
-    campaign = ET.fromstring(data)
-else:
-    tree = ET.parse(mekhq_path + 'campaigns/' + campaign_file)
-    campaign = tree.getroot()
-
-#stuff we need 
-campaign_info = campaign.find('info')
-date = datetime.datetime.strptime(campaign_info.find('calendar').text, '%Y-%m-%d')
-kills = campaign.find('kills')
-skill_types = campaign.find('skillTypes')
-personnel = campaign.find('personnel')
-missions = campaign.find('missions')
-forces = campaign.find('forces')
-units = campaign.find('units')
+#rate the skills of everyone in a list of Person with one of the selected 
+#roles in a single pass. Returns a dictionary of uuid to their skill rating 
+#(see get_skill_rating)
+def rate_skills(personnel):
+    ratings = {}
+    for person in personnel:
+        if(person.role not in roles):
+            continue
+        ratings[person.uuid] = get_skill_rating(role_skills.get(person.role, ()), person.skills)
+    return ratings
 
-# ----------------------------------------------------------------------------
-# Process default and custom rank structure and skill types for later use
-# ----------------------------------------------------------------------------
+#combine the skills found for a role into a list of the experience level 
+#(an index into skill_level_names) and the target numbers. Returns None if
+#the person does not have the primary skill for their role
+def get_skill_rating(wanted, found):
+    if(len(wanted) == 0 or wanted[0] not in found):
+        return None
+    levels = []
+    targets = []
+    for sk_name in wanted:
+        if(sk_name in found):
+            level, bonus = found[sk_name]
+            levels.append(skill_dict[sk_name].get_skill_level(level))
+            targets.append(skill_dict[sk_name].get_target_desc(level, bonus))
+    lvl = int(sum(levels)/len(levels))
+    tgt_desc = "/".join(targets)
+    if(len(targets) > 1):
+        tgt_desc = re.sub(r"\+", '', tgt_desc)
+    return [lvl, tgt_desc]
 
-rank_tree = ET.parse(mekhq_path + 'data/universe/ranks.xml')
-rank_systems = rank_tree.getroot()
-all_rank_lists = {}
-for rank_system in rank_systems.findall('rankSystem'):
-    code = get_xml_text(rank_system.find('code'))   
-    all_rank_lists[code] = process_rank_system(rank_system)
-
-#now check for a custom rank system to append
-rank_system = campaign_info.find('rankSystem')
-all_rank_lists['CUSTOM'] = process_rank_system(rank_system)
-if(get_xml_text(rank_system.find("system")) == ''):
-    rank_system_default = 'CUSTOM'
-else:
-    rank_system_default = get_xml_text(rank_system.find("system"))
-
-
-
-#process skill types
-for skill_type in skill_types.findall("skillType"):
-    skill_name = get_xml_text(skill_type.find('name'))
-    skill_target = int(get_xml_text(skill_type.find('target')))
-    skill_count_up = get_xml_text(skill_type.find('countUp')) == 'true'
-    skill_green = int(get_xml_text(skill_type.find('greenLvl')))
-    skill_reg = int(get_xml_text(skill_type.find('regLvl')))
-    skill_vet = int(get_xml_text(skill_type.find('vetLvl')))
-    skill_elite = int(get_xml_text(skill_type.find('eliteLvl')))
-    skill_dict[skill_name] = SkillType(skill_name, skill_target, skill_count_up, skill_green, skill_reg, skill_vet, skill_elite)
+#turn a skill rating into the experience level name and target numbers
+def get_skill_desc(rating):
+    if(rating is None):
+        return None
+    return (skill_level_names[rating[0]], rating[1])
 
-# ----------------------------------------------------------------------------
-# Process the xml and output results to campaign directory
-# ----------------------------------------------------------------------------
+#plain records of everything needed to render each kind of page, so that
+#rendering can be handed off to worker processes
+PersonRecord = namedtuple('PersonRecord', [
+    'uuid', 'name', 'title', 'status', 'phenotype', 'role', 'role_name', 
+    'skill_desc', 'callsign', 'kill_count', 'birthdate', 'deathdate', 
+    'rank_number', 'rank_name', 'unit_name', 'unit_id', 'tro_url', 
+    'force_name', 'force_slug', 'portrait_file', 'portrait_path', 
+    'portrait_variants', 'bio'])
+MissionRecord = namedtuple('MissionRecord', [
+    'name', 'mission_type', 'desc', 'order', 'start', 'end', 'employer',
+    'location', 'status'])
+ScenarioRecord = namedtuple('ScenarioRecord', [
+    'mission_name', 'name', 'desc', 'report', 'date', 'status'])
 
-# process forces
-process_forces(forces, None, None)
-
-#loop through personnel and print out markdown file for each one
-for person in personnel.findall('person'):
-    uuid  = person.find('id').text
-    primary_role = person.find('primaryRole').text
-    role_name = get_person_role(primary_role)
-    first = get_xml_text(person.find('givenName'))
-    surname = get_xml_text(person.find('surname'))
-    bloodname = get_xml_text(person.find('bloodname'))
-    name = get_xml_text(person.find('name'))
-    if(name == ''):
-        name = first
-        if(surname != ''):
-            name = name + ' ' + surname
-    if(bloodname != '' and surname == ''):
-        name = name + ' ' + bloodname
-    status = get_person_status(get_xml_text(person.find('status')))
-    birthdate = get_xml_date(person.find('birthday'))
-    deathdate = get_xml_date(person.find('deathday'))
-    clan = get_xml_text(person.find('clan')) == 'true'
-    phenotype = get_xml_text(person.find('phenotype'))
-    if(clan):
-        if(phenotype == '0' or phenotype == ''):
+#pull everything we need for a person's page out of their Person record. 
+#Returns None for people who do not get a page
+def extract_person(person, export):
+    if person.role not in roles or person.name == '':
+        return None
+    if(person.clan):
+        if(person.phenotype == '0' or person.phenotype == ''):
             phenotype = 'Freeborn Clan'
         else:
             phenotype = 'Trueborn Clan'
     else:
         phenotype = ''
-    rank_number = get_xml_text(person.find('rank'))
-    person_rank_system = get_xml_text(person.find('rankSystem'))
-    if(person_rank_system == '' or person_rank_system == '-1'):
-        person_rank_system = rank_system_default
-    if(rank_number is not None):
-        rank_name = find_rank(int(rank_number), person_rank_system, primary_role)
-    unit_id = find_unit(uuid, units)
+    person_rank_system = get_person_rank_system(person, export.rank_system_default)
+    rank_name = find_rank(person.rank, person_rank_system, person.role)
+    unit_id = export.crew_units.get(person.uuid)
     unit_name = None
-    force_name = None
+    tro_url = None
+    force = None
     if(unit_id is not None):
-        unit_name = get_unit_name(unit_id, units)
-        force_name = find_force(unit_id, forces, None, None)
-    dead = deathdate is not None
-    if(dead):
-        age = relativedelta.relativedelta(deathdate, birthdate).years
+        unit_name = export.unit_names.get(unit_id)
+        force = export.unit_forces.get(unit_id)
+        tro_url = export.tro_urls.get(urlify(unit_name))
+    title = person.name
+    if(rank_name is not None):
+        title = rank_name + ' ' + person.name
+    #only list the smaller copies of the portrait if they were made
+    portrait_variants = ()
+    if(person.portrait_path != '' and person.portrait_file != ''):
+        new_portrait_file = replace_portrait_name(person.portrait_file, urlify(person.name))
+        portrait_variants = tuple(export.portrait_variants.get(new_portrait_file, {}).items())
+    return PersonRecord(person.uuid, person.name, title, 
+                        get_person_status(person.status), phenotype, person.role, 
+                        get_person_role(person.role), 
+                        get_skill_desc(export.skill_ratings.get(person.uuid)), 
+                        person.callsign, export.kill_tally.count(person.uuid), 
+                        person.birthdate, person.deathdate, person.rank, rank_name, 
+                        unit_name, unit_id, tro_url,
+                        force.full_name if force is not None else None,
+                        force.slug if force is not None else None,
+                        person.portrait_file, person.portrait_path, 
+                        portrait_variants, person.bio)
+
+#render a person's page. Returns the file path, the page, the person's slug, 
+#and the file name for their portrait (or None if they do not have one)
+def render_person(date, record):
+    #dateutil is only needed here, so only load it when we actually render
+    from dateutil import relativedelta
+    slug = urlify(record.name)
+    if(record.deathdate is not None):
+        age = relativedelta.relativedelta(record.deathdate, record.birthdate).years
     else:
-        age = relativedelta.relativedelta(date, birthdate).years
-    if primary_role in roles and name != '':
-        title = name
-        if(rank_name is not None):
-            title = rank_name + ' ' + name
-        bio = get_xml_text(person.find('biography'))
-        skill_desc = get_skill_report(person)
-        kill_count = count_kills(uuid, kills)
-        portrait = person.find('portrait')
-        if(portrait is None):
-            portrait_file = ''
-            portrait_path = ''
-        else:
-            portrait_file = get_portrait_file(portrait.find('filename'))
-            portrait_path = get_portrait_path(portrait.find('category'))+portrait_file
-        callsign = get_xml_text(person.find('callsign'))
-        f = open('campaign/_personnel/' + urlify(name) + '.md', 'w')
-        f.write('---\n')
-        f.write('layout: bio\n')
-        f.write('title: ' + title + '\n')
-        f.write('name: ' + name + '\n')
-        f.write('status: ' + status + '\n')
-        if(phenotype != ''):
-            f.write('phenotype: ' + phenotype + '\n')
-        f.write('role: ' + str(primary_role) + '\n')
-        f.write('role-name: ' + role_name + '\n')
-        if(skill_desc is not None):
-            f.write('skill-level: ' + skill_desc[0] + '\n')
-            f.write('skill-detail: ' + skill_desc[1] + '\n')
-        if(callsign != ''):
-            f.write('callsign: ' + callsign + '\n')
-        if(kill_count>0):
-            f.write('kills: ' + str(kill_count) + '\n')
-        f.write('age: ' + str(age) + '\n')
-        if(rank_number is not None):
-            f.write('rank-number: ' + rank_number + '\n')
-        if(rank_name is not None):
-            f.write('rank-name: ' + rank_name + '\n')
-        if(unit_name is not None):
-            f.write('unit: ' + unit_name + '\n')
-            f.write('unit-id: ' + unit_id + '\n')
-            f.write('unit-slug: ' + urlify(unit_name) + '\n')
-        f.write('slug: ' + urlify(name) + '\n')
-        if(force_name is not None):
-            f.write('force: ' + force_name + '\n')
-            f.write('force-slug: ' + urlify(force_name) + '\n')
-        if(portrait_path != '' and portrait_file != ''):
-            new_portrait_file = replace_portrait_name(portrait_file, urlify(name))
-            portrait_paths[new_portrait_file] = portrait_path
-            f.write('portrait: ' + new_portrait_file + '\n')
-        f.write('---\n\n')
-        f.write(unescape(bio))
-        f.close()
-  
-#loop through missions and scenarios. Use slugs to link scenarios
-#to mission, but actually linking will be done by liquid
-for mission in missions.findall('mission'):
-    mission_name = mission.find('name').text
-    mission_type = get_xml_text(mission.find('type'))
-    mission_desc = get_xml_text(mission.find('desc'))
-    mission_id = int(mission.attrib['id'])*10
-    mission_start = get_xml_date(mission.find('startDate'))
-    mission_end = get_xml_date(mission.find('endDate'))
-    mission_employer = get_xml_text(mission.find('employer'))
-    mission_location = get_xml_text(mission.find('systemId'))
-    mission_status = get_xml_text(mission.find('status'))
-    f = open('campaign/_missions/' + urlify(mission_name) + '.md', 'w')
+        age = relativedelta.relativedelta(date, record.birthdate).years
+    f = io.StringIO()
+    f.write('---\n')
+    f.write('layout: bio\n')
+    f.write('title: ' + record.title + '\n')
+    f.write('name: ' + record.name + '\n')
+    f.write('status: ' + record.status + '\n')
+    if(record.phenotype != ''):
+        f.write('phenotype: ' + record.phenotype + '\n')
+    f.write('role: ' + str(record.role) + '\n')
+    f.write('role-name: ' + record.role_name + '\n')
+    if(record.skill_desc is not None):
+        f.write('skill-level: ' + record.skill_desc[0] + '\n')
+        f.write('skill-detail: ' + record.skill_desc[1] + '\n')
+    if(record.callsign != ''):
+        f.write('callsign: ' + record.callsign + '\n')
+    if(record.kill_count>0):
+        f.write('kills: ' + str(record.kill_count) + '\n')
+    f.write('age: ' + str(age) + '\n')
+    f.write('rank-number: ' + str(record.rank_number) + '\n')
+    if(record.rank_name is not None):
+        f.write('rank-name: ' + record.rank_name + '\n')
+    if(record.unit_name is not None):
+        f.write('unit: ' + record.unit_name + '\n')
+        f.write('unit-id: ' + record.unit_id + '\n')
+        f.write('unit-slug: ' + urlify(record.unit_name) + '\n')
+        if(record.tro_url is not None):
+            f.write('tro-slug: ' + urlify(record.unit_name) + '\n')
+            f.write('tro-url: ' + record.tro_url + '\n')
+    f.write('slug: ' + slug + '\n')
+    if(record.force_name is not None):
+        f.write('force: ' + record.force_name + '\n')
+        f.write('force-slug: ' + record.force_slug + '\n')
+    new_portrait_file = None
+    if(record.portrait_path != '' and record.portrait_file != ''):
+        new_portrait_file = replace_portrait_name(record.portrait_file, slug)
+        f.write('portrait: ' + new_portrait_file + '\n')
+        for variant, variant_file in record.portrait_variants:
+            f.write('portrait-' + variant + ': ' + variant_file + '\n')
+    f.write('---\n\n')
+    f.write(unescape(record.bio))
+    return 'campaign/_personnel/' + slug + '.md', f.getvalue(), slug, new_portrait_file
+
+#pull everything we need for a mission's page and the pages of its
+#scenarios out of its Mission record. Returns a mission record and a list of 
+#scenario records
+def extract_mission(mission):
+    mission_record = MissionRecord(
+        mission.name, mission.mission_type, mission.desc, 
+        int(mission.mission_id)*10, mission.start, mission.end,
+        mission.employer, mission.location, mission.status)
+    scenario_records = []
+    for scenario in mission.scenarios:
+        scenario_records.append(ScenarioRecord(
+            mission.name, scenario.name, scenario.desc, scenario.report,
+            scenario.date, scenario.status))
+    return mission_record, scenario_records
+
+#render a mission's page. Returns the file path and the page
+def render_mission(record):
+    f = io.StringIO()
     f.write('---\n')
     f.write('layout: mission\n')
-    f.write('title: ' + mission_name + '\n')
-    if(mission_start is not None):
-        f.write('start-date: ' + mission_start.strftime('%Y-%m-%d') + '\n')
-    if(mission_end is not None):
-        f.write('end-date: ' + mission_end.strftime('%Y-%m-%d') + '\n')
-    if(mission_type != ''):
-        f.write('type: ' + mission_type + '\n')
-    if(mission_employer != ''):
-        f.write('employer: ' + mission_employer + '\n')
-    if(mission_location != ''):
-        f.write('location: ' + mission_location + '\n')
-    if(mission_status != ''):
-        f.write('status: ' + mission_status_dict[mission_status] + '\n')
-    f.write('mission-order: ' + str(mission_id) + '\n')
-    f.write('slug: ' + urlify(mission_name) + '\n')
+    f.write('title: ' + record.name + '\n')
+    if(record.start is not None):
+        f.write('start-date: ' + record.start.strftime('%Y-%m-%d') + '\n')
+    if(record.end is not None):
+        f.write('end-date: ' + record.end.strftime('%Y-%m-%d') + '\n')
+    if(record.mission_type != ''):
+        f.write('type: ' + record.mission_type + '\n')
+    if(record.employer != ''):
+        f.write('employer: ' + record.employer + '\n')
+    if(record.location != ''):
+        f.write('location: ' + record.location + '\n')
+    if(record.status != ''):
+        f.write('status: ' + mission_status_dict[record.status] + '\n')
+    f.write('mission-order: ' + str(record.order) + '\n')
+    f.write('slug: ' + urlify(record.name) + '\n')
     f.write('---\n\n')
-    f.write(unescape(mission_desc))
-    f.close()
-    scenarios = mission.find('scenarios')
-    if(scenarios is not None):
-        for scenario in scenarios.findall('scenario'):
-            scenario_name = scenario.find('name').text
-            scenario_desc = get_xml_text(scenario.find('desc'))
-            scenario_aar = get_xml_text(scenario.find('report'))
-            scenario_date = get_xml_date(scenario.find('date'))
-            scenario_status = get_xml_text(scenario.find('status'))
-            f = open('campaign/_scenarios/' + urlify(mission_name + ' ' + scenario_name) + '.md', 'w')
-            f.write('---\n')
-            f.write('layout: mission\n')
-            f.write('title: ' + scenario_name + '\n')
-            if(scenario_date is not None):
-                f.write('date: ' + scenario_date.strftime('%Y-%m-%d') + '\n')
-            if(scenario_status != ''):
-                f.write('status: ' + scenario_status_dict[scenario_status] + '\n')
-            f.write('mission: ' + mission_name + '\n')
-            f.write('mission-slug: ' + urlify(mission_name) + '\n')
-            f.write('---\n\n')
-            f.write(scenario_desc + '\n')
-            if(scenario_aar != ''):
-                f.write('\n##### After-Action Report\n\n')
-                f.write(scenario_aar)
-            f.close()
+    f.write(unescape(record.desc))
+    return 'campaign/_missions/' + urlify(record.name) + '.md', f.getvalue()
+
+#render a scenario's page. Returns the file path and the page
+def render_scenario(record):
+    f = io.StringIO()
+    f.write('---\n')
+    f.write('layout: mission\n')
+    f.write('title: ' + record.name + '\n')
+    if(record.date is not None):
+        f.write('date: ' + record.date.strftime('%Y-%m-%d') + '\n')
+    if(record.status != ''):
+        f.write('status: ' + scenario_status_dict[record.status] + '\n')
+    f.write('mission: ' + record.mission_name + '\n')
+    f.write('mission-slug: ' + urlify(record.mission_name) + '\n')
+    f.write('---\n\n')
+    f.write(record.desc + '\n')
+    if(record.report != ''):
+        f.write('\n##### After-Action Report\n\n')
+        f.write(record.report)
+    return 'campaign/_scenarios/' + urlify(record.mission_name + ' ' + record.name) + '.md', f.getvalue()
+
+#custom class for the process pool used to render pages. The pool is only 
+#started once there is a batch of pages big enough to be worth it, and
+#everything is rendered in this process when workers is 1
+class RenderPool:
+    def __init__(self, workers):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+
+    #render every record with render_func, in order. With a cache of record to
+    #result only new records are rendered, and small batches stay in process
+    def map(self, render_func, records, cache=None, threshold=None):
+        if(cache is not None):
+            new_records = [record for record in records if record not in cache]
+            results = dict(zip(new_records, self.map(render_func, new_records)))
+            results.update((record, cache[record]) for record in records if record in cache)
+            cache.clear()
+            cache.update(results)
+            return [results[record] for record in records]
+        if(threshold is None):
+            threshold = parallel_render_threshold
+        if(self.workers == 1 or len(records) < threshold):
+            return [render_func(record) for record in records]
+        if(self.pool is None):
+            self.pool = ProcessPoolExecutor(self.workers)
+        chunksize = max(1, len(records) // (self.workers * 4))
+        return list(self.pool.map(render_func, records, chunksize=chunksize))
+
+    def shutdown(self):
+        if(self.pool is not None):
+            self.pool.shutdown()
+            self.pool = None
+
+#custom class to hold everything the stages of an export share. caches is 
+#kept between exports of the same campaign (as in watch mode), or is None
+class CampaignExport:
+    def __init__(self, campaign_path, ranks_file, writer, pool, caches=None,
+                 sections=None, personnel_filter=None, mission_filter=None):
+        self.campaign_path = campaign_path
+        self.ranks_file = ranks_file
+        self.writer = writer
+        self.pool = pool
+        self.caches = caches
+        if(sections is None):
+            sections = list(export_sections)
+        self.sections = sections
+        self.personnel_filter = personnel_filter
+        self.mission_filter = mission_filter
+        self.stages = [(stage_name, stage) for stage_name, stage in export_stages 
+                       if stage_name not in stage_sections or 
+                       any(name in sections for name in stage_sections[stage_name])]
+        self.campaign_sections = [name for name in campaign_sections 
+                                  if any(name in export_sections[section][0] for section in sections)]
+        self.portrait_paths = dict(portrait_paths)
+        self.person_slugs = {}
+        self.missing_portraits = []
+        self.portrait_variants = {}
+        self.read_timings = {}
+
+# ----------------------------------------------------------------------------
+# Export stages
+# ----------------------------------------------------------------------------
+
+#get the cache of rendered pages called name from the caches kept between 
+#exports. The cache is emptied whenever any of depends changes. Returns None
+#if caches are not being kept
+def get_render_cache(export, name, *depends):
+    if(export.caches is None):
+        return None
+    if(export.caches.get(name, (None,))[0] != depends):
+        export.caches[name] = (depends, {})
+    return export.caches[name][1]
+
+#each stage returns a dictionary of how many of each kind of thing it 
+#handled, for profiling
+
+#load the campaign file
+def read_campaign(export):
+    campaign = load_campaign(export.campaign_path, export.read_timings, 
+                             export.campaign_sections)
+    export.campaign = campaign
+    export.date = campaign.date
+    return {'skill types': len(campaign.skill_types), 'personnel': len(campaign.personnel),
+            'missions': len(campaign.missions), 'forces': len(campaign.forces),
+            'units': len(campaign.units), 'kills': sum(campaign.kills.totals.values())}
+
+#build the lookups for units, kills, forces, and the TRO pages, blog posts, 
+#and roster pages on the site
+def index_campaign(export):
+    export.crew_units, export.unit_names = index_units(export.campaign.units)
+    export.kill_tally = export.campaign.kills
+    export.force_list = export.campaign.forces
+    export.unit_forces = index_force_units(export.force_list)
+    export.tro_urls = {}
+    if('personnel' in export.sections):
+        export.tro_urls = index_tro('campaign/_tro/')
+    export.related_posts = {}
+    export.roster_pages = []
+    if('data' in export.sections):
+        export.related_posts = index_posts('campaign/_posts/')
+        export.roster_pages = index_roster_pages('personnel-roles/')
+    return {'units': len(export.unit_names), 'crew': len(export.crew_units),
+            'kills': sum(export.kill_tally.totals.values()), 
+            'forces': len(export.force_list), 'tro': len(export.tro_urls),
+            'related posts': sum(len(posts) for index in export.related_posts.values() 
+                                 for posts in index.values()),
+            'roster pages': len(export.roster_pages)}
+
+#process default and custom rank structure for later use
+def setup_ranks(export):
+    if(export.caches is not None):
+        #keep the compiled rank table in memory between exports
+        ranks_key = (export.ranks_file, os.stat(export.ranks_file).st_mtime_ns)
+        if(export.caches.get('ranks', (None,))[0] != ranks_key):
+            export.caches['ranks'] = (ranks_key, load_rank_table(export.ranks_file))
+        base_table = export.caches['ranks'][1]
+    else:
+        base_table = load_rank_table(export.ranks_file)
+    export.rank_system_default = use_rank_table(base_table, export.campaign)
+    return {'ranks': len(rank_table)}
+
+#fill rank_table with the rank systems in base_table and the custom rank 
+#system of campaign. Returns the code of the campaign's default rank system
+def use_rank_table(base_table, campaign):
+    rank_table.clear()
+    rank_table.update(base_table)
+    compile_rank_system('CUSTOM', campaign.custom_ranks, rank_table)
+    if(campaign.rank_system == ''):
+        return 'CUSTOM'
+    return campaign.rank_system
+
+#set up the campaign's skill types and rate everyone's skills
+def setup_skills(export):
+    skill_dict.clear()
+    skill_dict.update(export.campaign.skill_types)
+    export.skill_ratings = rate_skills(export.campaign.personnel)
+    return {'skill types': len(skill_dict), 'ratings': len(export.skill_ratings)}
+
+def export_forces(export):
+    process_forces(export.force_list, export.writer)
+    return {'forces': len(export.force_list)}
+
+#write out a page for everyone with a selected role, keeping track of the 
+#slugs of everyone we write out
+def export_personnel(export):
+    if('portraits' not in export.sections):
+        #use the smaller copies of portraits made by an earlier export
+        export.portrait_variants = read_portrait_variants()
+    records = []
+    for person in select_people(export.campaign.personnel, export.personnel_filter):
+        record = extract_person(person, export)
+        if(record is not None):
+            records.append(record)
+    pages = export.pool.map(partial(render_person, export.date), records,
+                            get_render_cache(export, 'personnel', export.date))
+    export.people = []
+    for record, (file_path, page, slug, new_portrait_file) in zip(records, pages):
+        export.writer.write(file_path, page)
+        export.person_slugs[record.uuid] = slug
+        export.people.append((record, slug, new_portrait_file))
+    return {'personnel': len(records)}
+
+#write out pages for missions and scenarios. Use slugs to link scenarios to
+#mission, but actually linking will be done by liquid
+def export_missions(export):
+    mission_records = []
+    scenario_records = []
+    for mission in select_missions(export.campaign.missions, export.mission_filter):
+        mission_record, mission_scenarios = extract_mission(mission)
+        mission_records.append(mission_record)
+        scenario_records.extend(mission_scenarios)
+    pages = export.pool.map(render_mission, mission_records, 
+                            get_render_cache(export, 'missions'))
+    pages.extend(export.pool.map(render_scenario, scenario_records,
+                                 get_render_cache(export, 'scenarios')))
+    for file_path, page in pages:
+        export.writer.write(file_path, page)
+    return {'missions': len(mission_records), 'scenarios': len(scenario_records)}
+
+#write out site data files
+def export_site_data(export):
+    top_forces, paths = build_toe(export.force_list, export.people, 
+                                  export.unit_forces, export.unit_names,
+                                  export.tro_urls)
+    export.writer.write('_data/toe.json', 
+                        json.dumps({'forces': top_forces, 'paths': paths}, indent=1))
+    export.writer.write('_data/related_posts.json', 
+                        json.dumps(export.related_posts, indent=1))
+    rosters = build_rosters(export.people, export.roster_pages, export.writer)
+    export.writer.write('_data/rosters.json', json.dumps(rosters, indent=1))
+    force_stats = build_force_stats(export.force_list, export.people, export.skill_ratings,
+                                    export.unit_forces, export.unit_names)
+    export.writer.write('_data/force_stats.json', json.dumps(force_stats, indent=1))
+    files = 4 + sum(len(roster['pages']) - 1 for roster in rosters.values())
+    if(write_kill_data):
+        write_kill_data_file(export.writer, '_data/kills.yml', export.kill_tally, 
+                             export.person_slugs, export.campaign.missions)
+        files += 1
+    return {'files': files}
+
+#copy over images from MekHQ for everyone who gets a page, along with 
+#smaller copies of them. This is done before the personnel pages are written
+#so that they only list the smaller copies that could be made
+def export_portraits(export):
+    for person in select_people(export.campaign.personnel, export.personnel_filter):
+        if(person.role in roles and person.name != '' and 
+           person.portrait_path != '' and person.portrait_file != ''):
+            new_portrait_file = replace_portrait_name(person.portrait_file, urlify(person.name))
+            export.portrait_paths[new_portrait_file] = person.portrait_path
+    export.missing_portraits, export.portrait_variants = sync_portraits(
+        export.portrait_paths, export.writer, export.pool, export.personnel_filter is not None)
+    return {'portraits': len(export.portrait_paths), 
+            'missing': len(export.missing_portraits)}
+
+#the stages of an export, in the order they are run
+export_stages = [
+    ('load', read_campaign),
+    ('index', index_campaign),
+    ('ranks', setup_ranks),
+    ('skill types', setup_skills),
+    ('forces', export_forces),
+    ('portraits', export_portraits),
+    ('personnel', export_personnel),
+    ('missions', export_missions),
+    ('site data', export_site_data)
+]
+
+#the parts of the website (see export_sections) each stage is needed for. 
+#Stages that are not listed are always run
+stage_sections = {
+    'ranks': ['personnel'],
+    'skill types': ['personnel'],
+    'forces': ['forces'],
+    'personnel': ['personnel'],
+    'missions': ['missions'],
+    'site data': ['data'],
+    'portraits': ['portraits']
+}
+
+#work out which parts of the website (see export_sections) to export from 
+#the ones asked for in only (None for all of them). data is only exported 
+#along with everything else, and only if nobody and no mission is filtered out
+def get_export_sections(only, personnel_filter=None, mission_filter=None):
+    sections = [name for name in export_sections 
+                if name != 'data' and (only is None or name in only)]
+    if(len(sections) == len(export_sections) - 1 and personnel_filter is None 
+       and mission_filter is None):
+        sections.append('data')
+    return sections
+
+#the people in personnel whose role or status is one of the values in 
+#wanted, given either as in MekHQ (MECHWARRIOR, KIA) or as on the website
+#(Mechwarrior, Killed in Action). Everyone is selected if wanted is None
+def select_people(personnel, wanted):
+    if(wanted is None):
+        return personnel
+    wanted = set(value.lower() for value in wanted)
+    selected = []
+    for person in personnel:
+        names = [person.role, roles_dict.get(person.role, person.role), 
+                 person.status, get_person_status(person.status)]
+        if(any(name.lower() in wanted for name in names)):
+            selected.append(person)
+    return selected
+
+#the missions in missions whose id or status is one of the values in 
+#wanted, with statuses given either as in MekHQ (SUCCESS) or as on the 
+#website (Success). Every mission is selected if wanted is None
+def select_missions(missions, wanted):
+    if(wanted is None):
+        return missions
+    wanted = set(value.lower() for value in wanted)
+    return [mission for mission in missions 
+            if mission.mission_id in wanted or mission.status.lower() in wanted or 
+            mission_status_dict.get(mission.status, mission.status).lower() in wanted]
+
+#custom class for recording the wall time, CPU time, item counts, and peak 
+#memory (if tracemalloc is tracing) of each stage of an export
+class StageProfiler:
+    def __init__(self, cprofile=False):
+        self.cprofile = cprofile
+        self.stages = []
+        self.hottest = None
+
+    def run(self, stage_name, stage, export):
+        profile = cProfile.Profile() if self.cprofile else None
+        tracing = tracemalloc.is_tracing()
+        if(tracing):
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if(profile is not None):
+            items = profile.runcall(stage, export)
+        else:
+            items = stage(export)
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        peak = tracemalloc.get_traced_memory()[1] if tracing else None
+        self.add(stage_name, wall, cpu, peak, items)
+        if(stage_name == 'load' and 'wall' in export.read_timings):
+            #split out the time spent reading and decompressing the file
+            read_wall = export.read_timings['wall']
+            read_cpu = export.read_timings['cpu']
+            self.add('decompress', read_wall, read_cpu, None, None, 'load')
+            self.add('parse', wall - read_wall, cpu - read_cpu, None, None, 'load')
+        if(profile is not None and (self.hottest is None or wall > self.hottest[1])):
+            self.hottest = (stage_name, wall, profile)
+
+    #record a stage, or part of the stage named part_of
+    def add(self, stage_name, wall, cpu, peak, items, part_of=None):
+        self.stages.append({'stage': stage_name, 'part_of': part_of, 'wall': wall, 
+                            'cpu': cpu, 'peak_mb': None if peak is None else peak / 2**20, 
+                            'items': items})
+
+    def table(self):
+        lines = ['%-14s %9s %9s %10s  %s' % ('stage', 'wall (s)', 'cpu (s)', 'peak (MB)', 'items')]
+        for stage in self.stages:
+            peak = '' if stage['peak_mb'] is None else '%.1f' % stage['peak_mb']
+            items = ', '.join(str(count) + ' ' + name for name, count in (stage['items'] or {}).items())
+            stage_name = stage['stage'] if stage['part_of'] is None else '  ' + stage['stage']
+            lines.append('%-14s %9.3f %9.3f %10s  %s' % (stage_name, stage['wall'], 
+                                                         stage['cpu'], peak, items))
+        top = [stage for stage in self.stages if stage['part_of'] is None]
+        lines.append('%-14s %9.3f %9.3f' % ('total', sum(stage['wall'] for stage in top),
+                                            sum(stage['cpu'] for stage in top)))
+        return '\n'.join(lines)
+
+#set up an export of the campaign in campaign_path into the current 
+#directory, optionally reusing a render pool and caches from an earlier one
+def start_export(campaign_path, workers=None, pool=None, caches=None, only=None,
+                 personnel_filter=None, mission_filter=None):
+    sections = get_export_sections(only, personnel_filter, mission_filter)
+    #old files in these directories that are not generated again get removed,
+    #so leave out the ones for parts of the website that are skipped or only
+    #partly exported
+    directories = []
+    for name in sections:
+        if(personnel_filter is not None and name in ['personnel', 'portraits']):
+            continue
+        if(mission_filter is not None and name == 'missions'):
+            continue
+        directories.extend(export_sections[name][1])
+    writer = SiteWriter(directories,
+                        None if caches is None else caches.setdefault('written', {}))
+    if(pool is None):
+        pool = RenderPool(workers)
+    return CampaignExport(campaign_path, mekhq_path + 'data/universe/ranks.xml',
+                          writer, pool, caches, sections, personnel_filter, 
+                          mission_filter)
+
+#export the campaign every time it changes, checking every interval 
+#seconds and keeping caches between exports so only changes are rewritten
+def watch_campaign(campaign_path, interval, only=None, personnel_filter=None, 
+                   mission_filter=None):
+    caches = {}
+    pool = RenderPool(render_workers)
+    last_state = None
+    reported = set()
+    print('Watching ' + campaign_path + ' for changes. Press Ctrl-C to stop.')
+    try:
+        while(True):
+            try:
+                stat = os.stat(campaign_path)
+                state = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                state = None
+            if(state is not None and state != last_state):
+                last_state = state
+                start = time.perf_counter()
+                export = start_export(campaign_path, pool=pool, caches=caches, only=only,
+                                      personnel_filter=personnel_filter, 
+                                      mission_filter=mission_filter)
+                try:
+                    for stage_name, stage in export.stages:
+                        stage(export)
+                except (ET.ParseError, EOFError, OSError) as error:
+                    #most likely MekHQ is still writing the file, so try 
+                    #again once it changes
+                    print('Could not read campaign (' + str(error) + '), waiting for the next save')
+                    continue
+                for portrait_name, portrait_path in export.missing_portraits:
+                    if((portrait_name, portrait_path) not in reported):
+                        reported.add((portrait_name, portrait_path))
+                        print('Could not find portrait ' + portrait_path + ' for ' + portrait_name)
+                summary = export.writer.finish()
+                print(time.strftime('%H:%M:%S') + ' exported in %.2fs' % (time.perf_counter() - start))
+                print(summary)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown()
+
+#read a batch manifest (its format is in the README), filling in the default
+#paths and making every path absolute
+def read_batch_manifest(manifest_file):
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_file))
+    entries = []
+    for entry in manifest['campaigns']:
+        paths = {}
+        for key, default in [('mekhq_path', mekhq_path), ('user_data_path', user_data_path)]:
+            path = entry.get(key, manifest.get(key, default))
+            paths[key] = os.path.join(base_dir, path).rstrip('/\\') + '/'
+        entries.append({
+            'campaign': paths['mekhq_path'] + 'campaigns/' + entry['campaign'],
+            'site': os.path.join(base_dir, entry['site']),
+            'mekhq_path': paths['mekhq_path'],
+            'user_data_path': paths['user_data_path']
+        })
+    return entries
+
+#set up a batch worker process with the rank tables shared by all campaigns
+def start_batch_worker(rank_tables):
+    shared_rank_tables.update(rank_tables)
+
+#export one campaign from a batch manifest in a worker process. Returns 
+#whether it worked, how long it took, and either the summary of files
+#written or the error that stopped it
+def export_batch_entry(entry):
+    global mekhq_path, user_data_path
+    start = time.perf_counter()
+    old_dir = os.getcwd()
+    try:
+        mekhq_path = entry['mekhq_path']
+        user_data_path = entry['user_data_path']
+        os.chdir(entry['site'])
+        export = start_export(entry['campaign'], 1)
+        for stage_name, stage in export.stages:
+            stage(export)
+        summary = export.writer.finish()
+        if(len(export.missing_portraits) > 0):
+            summary = summary + '\n' + str(len(export.missing_portraits)) + ' portraits could not be found'
+        return True, time.perf_counter() - start, summary
+    except Exception:
+        return False, time.perf_counter() - start, traceback.format_exc()
+    finally:
+        os.chdir(old_dir)
+
+#export every campaign in a batch manifest on jobs worker processes. Failed
+#campaigns are reported without stopping the others. Returns the failures
+def export_batch(manifest_file, jobs):
+    entries = read_batch_manifest(manifest_file)
+    rank_tables = {}
+    for entry in entries:
+        ranks_file = os.path.abspath(entry['mekhq_path'] + 'data/universe/ranks.xml')
+        if(ranks_file not in rank_tables):
+            try:
+                rank_tables[ranks_file] = load_rank_table(ranks_file)
+            except (OSError, ET.ParseError):
+                #leave it to the campaign export to report
+                pass
+    start = time.perf_counter()
+    failures = 0
+    with ProcessPoolExecutor(jobs, initializer=start_batch_worker, 
+                             initargs=(rank_tables,)) as pool:
+        futures = [pool.submit(export_batch_entry, entry) for entry in entries]
+        for entry, future in zip(entries, futures):
+            ok, seconds, report = future.result()
+            name = os.path.basename(entry['campaign']) + ' -> ' + entry['site']
+            if(ok):
+                print(name + ': exported in %.2fs' % seconds)
+            else:
+                failures += 1
+                print(name + ': FAILED after %.2fs' % seconds)
+            print('  ' + report.strip().replace('\n', '\n  '))
+    print('Exported ' + str(len(entries) - failures) + ' of ' + str(len(entries)) + 
+          ' campaigns in %.2fs' % (time.perf_counter() - start))
+    return failures
+
+# ----------------------------------------------------------------------------
+# Snapshot diffs
+# ----------------------------------------------------------------------------
+
+#the kinds of entities compared between snapshots, and what to call them 
+#in a report
+snapshot_kinds = [('people', 'person'), ('units', 'unit'), ('forces', 'force'),
+                  ('missions', 'mission'), ('scenarios', 'scenario')]
+
+#version of the fingerprints made by fingerprint_campaign. Change this when 
+#changing what goes into them, so that cached fingerprints are not reused
+snapshot_format = 1
+
+#describe every entity in campaign by the fields shown on the website, as
+#kind to id to (fingerprint, fields), so snapshots compare by digest
+def fingerprint_campaign(campaign, base_table):
+    default_system = use_rank_table(base_table, campaign)
+    unit_forces = index_force_units(campaign.forces)
+    crew_units = index_units(campaign.units)[0]
+    entities = {kind: {} for kind, label in snapshot_kinds}
+    names = {}
+    for person in campaign.personnel:
+        names[person.uuid] = person.name
+        if(person.role not in roles or person.name == ''):
+            continue
+        rank_system = get_person_rank_system(person, default_system)
+        unit = campaign.units.get(crew_units.get(person.uuid))
+        force = unit_forces.get(crew_units.get(person.uuid))
+        entities['people'][person.uuid] = {
+            'name': person.name,
+            'role': roles_dict.get(person.role, person.role),
+            'status': get_person_status(person.status),
+            'rank': find_rank(person.rank, rank_system, person.role) or str(person.rank),
+            'unit': unit.name if unit is not None else None,
+            'force': (force.full_name or force.name) if force is not None else None,
+            'kills': campaign.kills.count(person.uuid)
+        }
+    for unit_id, unit in campaign.units.items():
+        force = unit_forces.get(unit_id)
+        entities['units'][unit_id] = {
+            'name': unit.name,
+            'crew': [names.get(uuid, uuid) for uuid in unit.crew],
+            'force': (force.full_name or force.name) if force is not None else None
+        }
+    for force in campaign.forces:
+        entities['forces'][force.force_id] = {
+            'name': force.full_name or force.name,
+            'units': sorted(campaign.units[unit_id].name for unit_id in force.unit_ids 
+                            if unit_id in campaign.units)
+        }
+    for mission in campaign.missions:
+        entities['missions'][mission.mission_id] = {
+            'name': mission.name,
+            'status': mission_status_dict.get(mission.status, mission.status),
+            'end': mission.end.strftime('%Y-%m-%d') if mission.end is not None else None
+        }
+        for scenario in mission.scenarios:
+            scenario_key = mission.mission_id + '/' + (scenario.scenario_id or scenario.name)
+            entities['scenarios'][scenario_key] = {
+                'name': mission.name + ': ' + scenario.name,
+                'mission': mission.name,
+                'status': scenario_status_dict.get(scenario.status, scenario.status),
+                'date': scenario.date.strftime('%Y-%m-%d') if scenario.date is not None else None
+            }
+    for kind in entities:
+        entities[kind] = {entity_id: (hashlib.sha1(json.dumps(fields, sort_keys=True).encode('utf-8')).digest(), fields)
+                          for entity_id, fields in entities[kind].items()}
+    return entities
+
+#load the fingerprints and date of the campaign file at file_path, cached by
+#path, size, modification time, and settings
+def load_snapshot(file_path, base_table, settings, cache):
+    stat = os.stat(file_path)
+    key = (stat.st_size, stat.st_mtime_ns, settings)
+    source = os.path.abspath(file_path)
+    if(cache.get(source, (None,))[0] != key):
+        campaign = load_campaign(file_path)
+        cache[source] = (key, campaign.date, fingerprint_campaign(campaign, base_table))
+    return cache[source][1], cache[source][2]
+
+#compare two snapshots from load_snapshot, returning the added, removed, and
+#changed entities of each kind, with [old, new] for each changed field
+def diff_snapshots(old, new):
+    diff = {}
+    for kind, label in snapshot_kinds:
+        old_entities = old[kind]
+        new_entities = new[kind]
+        changes = {'added': [], 'removed': [], 'changed': []}
+        for entity_id, (fingerprint, fields) in new_entities.items():
+            if(entity_id not in old_entities):
+                changes['added'].append(dict(fields, id=entity_id))
+            elif(old_entities[entity_id][0] != fingerprint):
+                old_fields = old_entities[entity_id][1]
+                changes['changed'].append(dict(
+                    fields, id=entity_id, 
+                    changes={field: [old_fields.get(field), value] 
+                             for field, value in fields.items() 
+                             if old_fields.get(field) != value}))
+        for entity_id, (fingerprint, fields) in old_entities.items():
+            if(entity_id not in new_entities):
+                changes['removed'].append(dict(fields, id=entity_id))
+        diff[kind] = changes
+    return diff
+
+#turn a diff into a list of markdown bullet points, one for each change
+def describe_diff(diff):
+    lines = []
+    for kind, label in snapshot_kinds:
+        for entity in diff[kind]['added']:
+            lines.append('- New ' + label + ': ' + str(entity['name']))
+        for entity in diff[kind]['removed']:
+            lines.append('- No longer listed: ' + str(entity['name']))
+        for entity in diff[kind]['changed']:
+            for field, (old_value, new_value) in entity['changes'].items():
+                if(isinstance(new_value, list)):
+                    old_value = ', '.join(old_value or [])
+                    new_value = ', '.join(new_value)
+                lines.append('- ' + str(entity['name']) + ': ' + field + ' ' + 
+                             str(old_value) + ' -> ' + str(new_value))
+    return lines
+
+#write a draft blog post recapping a diff to campaign/_drafts, linking the
+#people and missions that changed. An existing draft is never overwritten
+def write_recap_draft(diff, old_date, new_date):
+    file_path = 'campaign/_drafts/recap-' + new_date.strftime('%Y-%m-%d') + '.md'
+    if(os.path.exists(file_path)):
+        print('Draft ' + file_path + ' already exists, not overwriting it')
+        return
+    people = [entity['name'] for change in ['added', 'changed'] for entity in diff['people'][change]]
+    missions = [entity['name'] for change in ['added', 'changed'] for entity in diff['missions'][change]]
+    missions.extend(entity['mission'] for change in ['added', 'changed'] 
+                    for entity in diff['scenarios'][change])
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('---\n')
+        f.write('layout: post\n')
+        f.write('title: Recap, ' + old_date.strftime('%Y-%m-%d') + ' to ' + new_date.strftime('%Y-%m-%d') + '\n')
+        f.write('date: ' + new_date.strftime('%Y-%m-%d') + '\n')
+        f.write('categories: recap\n')
+        if(len(people) > 0):
+            f.write('personnel:\n')
+            for name in people:
+                f.write('  - ' + urlify(name) + '\n')
+        if(len(missions) > 0):
+            f.write('mission:\n')
+            for name in dict.fromkeys(missions):
+                f.write('  - ' + urlify(name) + '\n')
+        f.write('---\n\n')
+        f.write('\n'.join(describe_diff(diff)) + '\n')
+    print('Draft recap saved to ' + file_path)
+
+#compare each campaign file in file_paths with the one before it, printing
+#the changes. The changes can also be saved as JSON to output, and a draft
+#recap post written for each pair of files
+def diff_campaigns(file_paths, output=None, draft=False):
+    cache_file = cache_path + 'snapshots.pickle'
+    try:
+        with open(cache_file, 'rb') as f:
+            cache = pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError):
+        cache = {}
+    ranks_file = mekhq_path + 'data/universe/ranks.xml'
+    base_table = load_rank_table(ranks_file)
+    settings = (snapshot_format, tuple(roles), os.stat(ranks_file).st_mtime_ns)
+    #campaign files can also be given by name in the campaigns directory
+    file_paths = [file_path if os.path.exists(file_path) else mekhq_path + 'campaigns/' + file_path
+                  for file_path in file_paths]
+    snapshots = [(file_path,) + load_snapshot(file_path, base_table, settings, cache) 
+                 for file_path in file_paths]
+    os.makedirs(cache_path, exist_ok=True)
+    with open(cache_file, 'wb') as f:
+        pickle.dump(cache, f)
+    reports = []
+    for (old_file, old_date, old), (new_file, new_date, new) in zip(snapshots, snapshots[1:]):
+        diff = diff_snapshots(old, new)
+        reports.append({'from': {'file': old_file, 'date': old_date.strftime('%Y-%m-%d')},
+                        'to': {'file': new_file, 'date': new_date.strftime('%Y-%m-%d')},
+                        'changes': diff})
+        print(os.path.basename(old_file) + ' -> ' + os.path.basename(new_file) + ':')
+        lines = describe_diff(diff)
+        print('\n'.join(lines) if len(lines) > 0 else 'No changes')
+        if(draft):
+            write_recap_draft(diff, old_date, new_date)
+    if(output is not None):
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=1, ensure_ascii=False)
+        print('Changes saved to ' + output)
 
 # ----------------------------------------------------------------------------
-# Copy over data from MekHQ
+# SQLite export
 # ----------------------------------------------------------------------------
 
-#copy over images
-for portrait_name in portrait_paths:
-    portrait_path = portrait_paths[portrait_name]
+#the tables written by export_sqlite as (name, columns, primary key). slug
+#is only set for people who get a page on the website
+sqlite_tables = [
+    ('campaign', [('key', 'TEXT'), ('value', 'TEXT')], ['key']),
+    ('people', [('uuid', 'TEXT'), ('name', 'TEXT'), ('slug', 'TEXT'), 
+                ('callsign', 'TEXT'), ('role', 'TEXT'), ('role_name', 'TEXT'), 
+                ('status', 'TEXT'), ('status_name', 'TEXT'), ('rank', 'INTEGER'), 
+                ('rank_name', 'TEXT'), ('birthdate', 'TEXT'), ('deathdate', 'TEXT'), 
+                ('clan', 'INTEGER'), ('phenotype', 'TEXT'), ('skill_level', 'INTEGER'), 
+                ('skill_level_name', 'TEXT'), ('skill_targets', 'TEXT'), 
+                ('kills', 'INTEGER'), ('unit_id', 'TEXT'), ('force_id', 'TEXT')], 
+     ['uuid']),
+    ('units', [('unit_id', 'TEXT'), ('name', 'TEXT'), ('force_id', 'TEXT')], 
+     ['unit_id']),
+    ('crew', [('unit_id', 'TEXT'), ('uuid', 'TEXT'), ('position', 'INTEGER')], 
+     ['unit_id', 'uuid']),
+    ('forces', [('force_id', 'TEXT'), ('name', 'TEXT'), ('full_name', 'TEXT'), 
+                ('slug', 'TEXT'), ('parent_id', 'TEXT'), ('depth', 'INTEGER'), 
+                ('position', 'INTEGER')], 
+     ['force_id']),
+    ('missions', [('mission_id', 'TEXT'), ('name', 'TEXT'), ('slug', 'TEXT'), 
+                  ('type', 'TEXT'), ('status', 'TEXT'), ('status_name', 'TEXT'), 
+                  ('start_date', 'TEXT'), ('end_date', 'TEXT'), ('employer', 'TEXT'), 
+                  ('location', 'TEXT')], 
+     ['mission_id']),
+    ('scenarios', [('scenario_key', 'TEXT'), ('scenario_id', 'TEXT'), 
+                   ('mission_id', 'TEXT'), ('name', 'TEXT'), ('slug', 'TEXT'), 
+                   ('status', 'TEXT'), ('status_name', 'TEXT'), ('date', 'TEXT')], 
+     ['scenario_key']),
+    ('mission_kills', [('uuid', 'TEXT'), ('mission_id', 'TEXT'), ('kills', 'INTEGER')], 
+     ['uuid', 'mission_id']),
+    ('scenario_kills', [('uuid', 'TEXT'), ('scenario_id', 'TEXT'), ('kills', 'INTEGER')], 
+     ['uuid', 'scenario_id'])
+]
+
+#indexes for the columns that queries are likely to filter or join on, as 
+#the table and its indexed columns. Primary keys are already indexed
+sqlite_indexes = [
+    ('people', ['status']),
+    ('people', ['role']),
+    ('people', ['force_id']),
+    ('people', ['unit_id']),
+    ('units', ['force_id']),
+    ('crew', ['uuid']),
+    ('forces', ['parent_id']),
+    ('missions', ['status']),
+    ('scenarios', ['mission_id']),
+    ('scenarios', ['scenario_id']),
+    ('mission_kills', ['mission_id']),
+    ('scenario_kills', ['scenario_id'])
+]
+
+#version of the schema above. Change this when changing the schema, so that
+#databases written by an older version are set up again from scratch
+sqlite_format = 1
+
+#format a date for the database
+def get_sqlite_date(date):
+    if(date is None):
+        return None
+    return date.strftime('%Y-%m-%d')
+
+#turn campaign into rows for each table in sqlite_tables, using the rank 
+#systems in base_table to name ranks. Returns a dictionary of table name to
+#a list of rows
+def get_sqlite_rows(campaign, base_table):
+    default_system = use_rank_table(base_table, campaign)
+    skill_dict.clear()
+    skill_dict.update(campaign.skill_types)
+    ratings = rate_skills(campaign.personnel)
+    unit_forces = index_force_units(campaign.forces)
+    crew_units = index_units(campaign.units)[0]
+    kills = campaign.kills
+    rows = {table: [] for table, columns, keys in sqlite_tables}
+    rows['campaign'] = [('name', campaign.name), 
+                        ('date', get_sqlite_date(campaign.date)),
+                        ('rank_system', default_system)]
+    for person in campaign.personnel:
+        rank_system = get_person_rank_system(person, default_system)
+        unit_id = crew_units.get(person.uuid)
+        force = unit_forces.get(unit_id)
+        rating = ratings.get(person.uuid)
+        slug = None
+        if(person.role in roles and person.name != ''):
+            slug = urlify(person.name)
+        rows['people'].append((
+            person.uuid, person.name, slug, person.callsign, person.role, 
+            roles_dict.get(person.role, person.role), person.status,
+            get_person_status(person.status),
+            person.rank, find_rank(person.rank, rank_system, person.role),
+            get_sqlite_date(person.birthdate), get_sqlite_date(person.deathdate),
+            int(person.clan), person.phenotype,
+            rating[0] if rating is not None else None,
+            skill_level_names[rating[0]] if rating is not None else None,
+            rating[1] if rating is not None else None,
+            kills.count(person.uuid), unit_id,
+            force.force_id if force is not None else None))
+    for unit_id, unit in campaign.units.items():
+        force = unit_forces.get(unit_id)
+        rows['units'].append((unit_id, unit.name, 
+                              force.force_id if force is not None else None))
+        #someone listed in more than one slot of a unit is only listed once
+        for position, uuid in enumerate(dict.fromkeys(unit.crew)):
+            rows['crew'].append((unit_id, uuid, position))
+    force_ids = {}
+    for position, force in enumerate(campaign.forces):
+        force_ids[force.slug] = force.force_id
+        rows['forces'].append((force.force_id, force.name, force.full_name, 
+                               force.slug, force_ids.get(force.parent_slug), 
+                               force.depth, position))
+    for mission in campaign.missions:
+        rows['missions'].append((
+            mission.mission_id, mission.name, urlify(mission.name), 
+            mission.mission_type, mission.status, 
+            mission_status_dict.get(mission.status, mission.status),
+            get_sqlite_date(mission.start), get_sqlite_date(mission.end),
+            mission.employer, mission.location))
+        for scenario in mission.scenarios:
+            rows['scenarios'].append((
+                mission.mission_id + '/' + (scenario.scenario_id or scenario.name),
+                scenario.scenario_id, mission.mission_id, scenario.name,
+                urlify(mission.name + ' ' + scenario.name), scenario.status,
+                scenario_status_dict.get(scenario.status, scenario.status),
+                get_sqlite_date(scenario.date)))
+    for table, counts in [('mission_kills', kills.missions), ('scenario_kills', kills.scenarios)]:
+        for uuid, by_id in counts.items():
+            for kill_id, count in by_id.items():
+                rows[table].append((uuid, kill_id, count))
+    return rows
+
+#create the tables and indexes of the database if they are not there yet. 
+#Tables from an older sqlite_format are dropped first
+def setup_sqlite(db):
+    if(db.execute('PRAGMA user_version').fetchone()[0] != sqlite_format):
+        for table, columns, keys in sqlite_tables:
+            db.execute('DROP TABLE IF EXISTS ' + table)
+    for table, columns, keys in sqlite_tables:
+        db.execute('CREATE TABLE IF NOT EXISTS ' + table + ' (' + 
+                   ', '.join(name + ' ' + kind for name, kind in columns) + 
+                   ', PRIMARY KEY (' + ', '.join(keys) + '))')
+    for table, columns in sqlite_indexes:
+        db.execute('CREATE INDEX IF NOT EXISTS ' + table + '_' + '_'.join(columns) + 
+                   ' ON ' + table + ' (' + ', '.join(columns) + ')')
+    db.execute('PRAGMA user_version = ' + str(sqlite_format))
+
+#insert rows into table, updating rows that are already there, and delete 
+#the rows that are not in rows any more. Returns the number of rows written 
+#and the number removed
+def upsert_rows(db, table, columns, keys, rows):
+    names = [name for name, kind in columns]
+    updates = [name for name in names if name not in keys]
+    db.executemany('INSERT INTO ' + table + ' (' + ', '.join(names) + ') VALUES (' + 
+                   ', '.join('?' for name in names) + ') ON CONFLICT (' + 
+                   ', '.join(keys) + ') DO UPDATE SET ' + 
+                   ', '.join(name + ' = excluded.' + name for name in updates), rows)
+    key_columns = [names.index(key) for key in keys]
+    current = set(tuple(row[i] for i in key_columns) for row in rows)
+    stale = [key for key in db.execute('SELECT ' + ', '.join(keys) + ' FROM ' + table) 
+             if key not in current]
+    db.executemany('DELETE FROM ' + table + ' WHERE ' + 
+                   ' AND '.join(key + ' = ?' for key in keys), stale)
+    return len(rows), len(stale)
+
+#write everything we read from the campaign file at campaign_path into the 
+#SQLite database at db_file, creating it if needed. Everything is written in
+#a single transaction, so the database is never left half updated
+def export_sqlite(campaign_path, db_file):
+    campaign = load_campaign(campaign_path)
+    rows = get_sqlite_rows(campaign, load_rank_table(mekhq_path + 'data/universe/ranks.xml'))
+    db = sqlite3.connect(db_file, isolation_level=None)
     try:
-        copyfile(mekhq_path + 'data/images/portraits/' + portrait_path, 'assets/images/portraits/' + portrait_name)
-    except:
+        db.execute('BEGIN')
         try:
-          copyfile(user_data_path + 'data/images/portraits/' + portrait_path, 'assets/images/portraits/' + portrait_name)
-        except:
-          pass
-          
-          
+            setup_sqlite(db)
+            summary = []
+            for table, columns, keys in sqlite_tables:
+                written, removed = upsert_rows(db, table, columns, keys, rows[table])
+                summary.append(table + ': ' + str(written) + ' rows, ' + 
+                               str(removed) + ' removed')
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+    finally:
+        db.close()
+    print('\n'.join(summary))
+    print('Campaign saved to ' + db_file)
+
+def main():
+    parser = argparse.ArgumentParser(description='Turn a MekHQ campaign into a Jekyll website.')
+    parser.add_argument('--profile', action='store_true',
+                        help='print the time, CPU time, and item counts of each stage '
+                        'and save them as JSON')
+    parser.add_argument('--profile-output', default=cache_path + 'profile.json',
+                        help='where to save the JSON profile (default: %(default)s)')
+    parser.add_argument('--cprofile', metavar='FILE',
+                        help='run each stage under cProfile and save the stats of the '
+                        'slowest stage to FILE, implies --profile')
+    parser.add_argument('--memory', action='store_true',
+                        help='also trace the peak memory of each stage, which makes the '
+                        'stages much slower, implies --profile')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and export the campaign again every time it is saved')
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help='seconds between checks for a new save in watch mode (default: %(default)s)')
+    parser.add_argument('--only', nargs='+', metavar='PART',
+                        choices=[name for name in export_sections if name != 'data'],
+                        help='only export these parts of the website (forces, personnel, '
+                        'missions, portraits), leaving the rest as it is')
+    parser.add_argument('--personnel', nargs='+', metavar='ROLE_OR_STATUS',
+                        help='only export the people with one of these roles or statuses')
+    parser.add_argument('--missions', nargs='+', metavar='ID_OR_STATUS',
+                        help='only export the missions (and their scenarios) with one of '
+                        'these ids or statuses')
+    parser.add_argument('--batch', metavar='MANIFEST',
+                        help='export every campaign listed in a JSON manifest to its own site')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='worker processes for batch mode (default: one per CPU)')
+    parser.add_argument('--diff', nargs='+', metavar='CAMPAIGN',
+                        help='show what changed between two or more saves of a campaign, '
+                        'each compared with the one before it')
+    parser.add_argument('--diff-output', metavar='FILE',
+                        help='save the changes found by --diff as JSON to FILE')
+    parser.add_argument('--draft', action='store_true',
+                        help='with --diff, also write a draft recap post for each pair of saves')
+    parser.add_argument('--sqlite', metavar='FILE',
+                        help='save the personnel, units, crews, forces, missions, scenarios, '
+                        'and kills of the campaign to a SQLite database instead of exporting the website')
+    args = parser.parse_args()
+    if(args.diff is not None):
+        if(len(args.diff) < 2):
+            parser.error('--diff needs at least two campaign files')
+        diff_campaigns(args.diff, args.diff_output, args.draft)
+        return
+    if(args.sqlite is not None):
+        export_sqlite(mekhq_path + 'campaigns/' + campaign_file, args.sqlite)
+        return
+    if(args.batch is not None):
+        if(export_batch(args.batch, args.jobs) > 0):
+            sys.exit(1)
+        return
+    only = args.only
+    if(only is None and (args.personnel is not None or args.missions is not None)):
+        #filtering people or missions on its own only exports what is filtered
+        only = []
+        if(args.personnel is not None):
+            only.extend(['personnel', 'portraits'])
+        if(args.missions is not None):
+            only.append('missions')
+    if(args.watch):
+        watch_campaign(mekhq_path + 'campaigns/' + campaign_file, args.interval,
+                       only, args.personnel, args.missions)
+        return
+    profiling = args.profile or args.cprofile is not None or args.memory
+    profiler = StageProfiler(args.cprofile is not None)
+    if(args.memory):
+        tracemalloc.start()
+
+    export = start_export(mekhq_path + 'campaigns/' + campaign_file, render_workers,
+                          only=only, personnel_filter=args.personnel, 
+                          mission_filter=args.missions)
+    try:
+        for stage_name, stage in export.stages:
+            if(profiling):
+                profiler.run(stage_name, stage, export)
+            else:
+                stage(export)
+    finally:
+        export.pool.shutdown()
+    for portrait_name, portrait_path in export.missing_portraits:
+        print('Could not find portrait ' + portrait_path + ' for ' + portrait_name)
+    print(export.writer.finish())
+
+    if(profiling):
+        if(args.memory):
+            tracemalloc.stop()
+        print()
+        print(profiler.table())
+        os.makedirs(os.path.dirname(args.profile_output) or '.', exist_ok=True)
+        with open(args.profile_output, 'w') as f:
+            json.dump({'campaign': campaign_file, 'stages': profiler.stages}, f, indent=1)
+        print('Profile saved to ' + args.profile_output)
+        if(profiler.hottest is not None):
+            profiler.hottest[2].dump_stats(args.cprofile)
+            print('cProfile stats for the ' + profiler.hottest[0] + ' stage saved to ' + args.cprofile)
+
+if __name__ == '__main__':
+    main()